@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import os
 from pathlib import Path
 
+from core import basedatos
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 MEDIA_URL = '/media/'
@@ -48,6 +50,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "main.middleware.MetricasMiddleware",
     "django.middleware.security.SecurityMiddleware",
     'whitenoise.middleware.WhiteNoiseMiddleware',
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -70,6 +73,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "main.context_processors.estado",
             ],
         },
     },
@@ -80,14 +84,116 @@ WSGI_APPLICATION = "core.wsgi.application"
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# SQLite en local; PostgreSQL si hay DATABASE_URL (ver core/basedatos.py).
+# DB_POOL=1 activa el pool de psycopg 3 en lugar de conexiones persistentes.
+# SQLITE_CONCURRENTE=1 activa WAL, busy timeout y BEGIN IMMEDIATE en SQLite.
 
 DATABASES = {
+    "default": basedatos.configurar(
+        os.environ.get("DATABASE_URL"),
+        os.environ.get("SQLITE_PATH", BASE_DIR / "db.sqlite3"),
+        conn_max_age=int(os.environ.get("CONN_MAX_AGE", 600)),
+        pool=os.environ.get("DB_POOL", "0") == "1",
+        pool_min=int(os.environ.get("DB_POOL_MIN", 2)),
+        pool_max=int(os.environ.get("DB_POOL_MAX", 10)),
+        sqlite_concurrente=os.environ.get("SQLITE_CONCURRENTE", "0") == "1",
+        sqlite_timeout=float(os.environ.get("SQLITE_TIMEOUT", 20)),
+    )
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Memoria local por defecto; en producción se puede apuntar a Redis/Memcached
+# con CACHE_BACKEND y CACHE_LOCATION para compartirla entre workers.
+
+CACHES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", "interactive-rs"),
     }
 }
 
+# ¿Ven todos los procesos (workers, volcar_votos, comandos de cron) la misma
+# caché? Con la de memoria local, cada uno tiene sus propias versiones de
+# ranking.py y fragmentos.py y no se entera de lo que cambian los demás.
+CACHE_COMPARTIDA = CACHES["default"]["BACKEND"] not in (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+# 304 a los anónimos en las páginas públicas y la API. El ETag sale de esas
+# versiones, así que solo se activa si la caché es compartida: si no, un
+# proceso seguiría dando por buenos datos que otro ya ha cambiado.
+GET_CONDICIONAL = CACHE_COMPARTIDA
+
+# Segundos que vive el ranking cacheado antes de reconstruirse desde la BD
+RANKING_CACHE_TIMEOUT = int(os.environ.get("RANKING_CACHE_TIMEOUT", 60))
+
+# Segundos que viven los fragmentos de plantilla compartidos (ranking, vídeos,
+# retos...). Se invalidan antes por versión al cambiar sus datos. Sin caché
+# compartida no se enteran de los cambios de otros procesos, así que no viven
+# más que el ranking.
+FRAGMENTOS_CACHE_TIMEOUT = int(os.environ.get("FRAGMENTOS_CACHE_TIMEOUT", 600))
+if not CACHE_COMPARTIDA:
+    FRAGMENTOS_CACHE_TIMEOUT = min(FRAGMENTOS_CACHE_TIMEOUT, RANKING_CACHE_TIMEOUT)
+
+# Elementos por página en las listas con "Cargar más" (vídeos, retos)
+PAGINA_TAMANO = int(os.environ.get("PAGINA_TAMANO", 20))
+
+# Segundos que vive el estado cacheado de cada usuario (aliado, votos de hoy)
+ESTADO_USUARIO_CACHE_TIMEOUT = int(os.environ.get("ESTADO_USUARIO_CACHE_TIMEOUT", 300))
+
+
+# Modo ráfaga de votos (write-behind): los votos se encolan en VotoPendiente
+# y `manage.py volcar_votos` los aplica por lotes cada VOTOS_INTERVALO_VOLCADO
+# segundos. Si nadie vuelca en VOTOS_RETRASO_MAXIMO segundos, vuelca la
+# propia petición de voto.
+VOTOS_MODO_RAFAGA = os.environ.get("VOTOS_MODO_RAFAGA", "0") == "1"
+VOTOS_INTERVALO_VOLCADO = float(os.environ.get("VOTOS_INTERVALO_VOLCADO", 2))
+VOTOS_RETRASO_MAXIMO = float(os.environ.get("VOTOS_RETRASO_MAXIMO", 10))
+VOTOS_LOTE = int(os.environ.get("VOTOS_LOTE", 1000))
+
+# Nº de fracciones en que se reparte el contador de cada objetivo de donación
+DONACION_FRACCIONES = int(os.environ.get("DONACION_FRACCIONES", 8))
+
+# Encuestas: cada proceso apunta qué opciones han recibido votos y recuenta
+# su OpcionEncuesta.votos ENCUESTA_INTERVALO_VOLCADO segundos después; los
+# resultados se sirven de una foto cacheada ENCUESTA_CACHE_RESULTADOS s.
+ENCUESTA_INTERVALO_VOLCADO = float(os.environ.get("ENCUESTA_INTERVALO_VOLCADO", 1))
+ENCUESTA_CACHE_RESULTADOS = int(os.environ.get("ENCUESTA_CACHE_RESULTADOS", 2))
+
+# Concesión diaria de puntos (manage.py conceder_puntos, una vez al día):
+# a todos los usuarios activos, extra a quien lleva PUNTOS_DIAS_RACHA_ALIADO
+# días con el mismo aliado y extra a quien votó el día anterior.
+PUNTOS_DIARIOS = int(os.environ.get("PUNTOS_DIARIOS", 20))
+PUNTOS_RACHA_ALIADO = int(os.environ.get("PUNTOS_RACHA_ALIADO", 10))
+PUNTOS_DIAS_RACHA_ALIADO = int(os.environ.get("PUNTOS_DIAS_RACHA_ALIADO", 7))
+PUNTOS_BONUS_VOTO = int(os.environ.get("PUNTOS_BONUS_VOTO", 5))
+
+# Resumen diario (manage.py actualizar_resumenes): solo se suman las filas con
+# id ya visto hace RESUMEN_RETRASO segundos. En PostgreSQL los ids no se
+# confirman en orden; el retraso debe superar la transacción más larga.
+RESUMEN_RETRASO = int(os.environ.get("RESUMEN_RETRASO", 60))
+
+
+# Métricas por petición (cabecera Server-Timing + log JSON en "main.metricas").
+# Desactivadas, el middleware se descarta al arrancar y no cuesta nada.
+METRICAS_ACTIVAS = os.environ.get("METRICAS_ACTIVAS", "0") == "1"
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "main.metricas": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
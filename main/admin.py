@@ -1,20 +1,44 @@
 from django.contrib import admin
-from .models import User, Participante, Alianza, RetoUsuario,  Encuesta, OpcionEncuesta, DonacionUsuario,  ObjetivoDonacion, Donacion, Voto, Reto, VideoTop
+from .models import User, MovimientoPuntos, ConcesionDiaria, Participante, Alianza, RetoUsuario, ProgresoReto, Encuesta, OpcionEncuesta, VotoEncuesta, DonacionUsuario,  ObjetivoDonacion, FraccionObjetivo, Donacion, Voto, VotoPendiente, ResumenDiario, MarcaResumen, Reto, VideoTop
 
 # Register your models here.
 admin.site.register(User)
+admin.site.register(ConcesionDiaria)
 
 admin.site.register(Alianza)
 admin.site.register(ObjetivoDonacion)
 admin.site.register(DonacionUsuario)
+admin.site.register(FraccionObjetivo)
 admin.site.register(Encuesta)
 admin.site.register(OpcionEncuesta)
+admin.site.register(VotoEncuesta)
 admin.site.register(RetoUsuario)
+admin.site.register(ProgresoReto)
 
 admin.site.register(Voto)
+admin.site.register(VotoPendiente)
+admin.site.register(ResumenDiario)
+admin.site.register(MarcaResumen)
 admin.site.register(Reto)
 admin.site.register(VideoTop)
 
+@admin.register(MovimientoPuntos)
+class MovimientoPuntosAdmin(admin.ModelAdmin):
+    # el libro solo crece desde puntos.py: aquí se consulta, no se toca
+    list_display = ('usuario', 'cantidad', 'motivo', 'referencia', 'fecha')
+    list_filter = ('motivo',)
+    list_select_related = ('usuario',)
+    search_fields = ('usuario__username', 'referencia')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 @admin.register(Participante)
 class ParticipanteAdmin(admin.ModelAdmin):
     list_display = ('nombre', 'puntos_totales', 'votos_recibidos', 'preview_foto')
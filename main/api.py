@@ -0,0 +1,113 @@
+"""
+API JSON de solo lectura para el overlay y los widgets del directo.
+
+Sirve los mismos datos que home y participante_detalle (ranking cacheado,
+primera Pagina de vídeos y retos) sin renderizar plantillas. Las respuestas
+públicas se guardan ya serializadas bajo claves con la versión de sus datos
+(ver fragmentos.py): mientras no cambien, cada petición es una lectura de
+caché, y con el ETag ni eso si el widget ya tiene la última.
+"""
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+from . import fragmentos, ranking
+from .imagenes import url_variante
+from .models import Participante, Reto, VideoTop
+from .paginacion import Pagina
+
+
+def _cacheado(clave, construir):
+    """JSON de `construir()`, guardado ya serializado bajo `clave`."""
+    payload = cache.get(clave)
+    if payload is None:
+        payload = json.dumps(construir(), cls=DjangoJSONEncoder, separators=(',', ':'))
+        cache.set(clave, payload, settings.FRAGMENTOS_CACHE_TIMEOUT)
+    return payload
+
+
+def etag(request, *args, **kwargs):
+    if not settings.GET_CONDICIONAL or not fragmentos.existe(kwargs.get('pk')):
+        return None
+    return fragmentos.etag_datos()
+
+
+def _participante(p):
+    return {
+        "id": p.id,
+        "nombre": p.nombre,
+        "posicion": p.posicion,
+        "puntos": p.puntos_totales,
+        "votos": p.votos_recibidos,
+        "afinidad": p.afinidad,
+        "aliados": p.aliados_activos,
+        "eliminado": p.eliminado,
+        "foto": url_variante(p.foto_hash, "thumb", "webp") if p.foto_hash else None,
+    }
+
+
+def ranking_json():
+    """El ranking completo, con la caché caliente sin tocar la BD."""
+    return _cacheado(
+        f'api:ranking:{ranking.version()}',
+        lambda: {"participantes": [_participante(p) for p in ranking.obtener_ranking()]},
+    )
+
+
+def participante_json(pk):
+    """
+    Ficha del participante con la primera página de vídeos y de retos.
+    Lanza Participante.DoesNotExist si no existe.
+    """
+    def construir():
+        participante = next((p for p in ranking.obtener_ranking() if p.id == pk), None)
+        if participante is None:
+            raise Participante.DoesNotExist
+        videos = Pagina(
+            VideoTop.objects.filter(participante_id=pk)
+            .only('id', 'fecha_subida', 'url_video', 'video_id', 'thumbnail_url'),
+            'fecha_subida',
+        )
+        retos = Pagina(
+            Reto.objects.filter(participante_id=pk)
+            .only('id', 'fecha', 'texto', 'puntos', 'completado'),
+            'fecha',
+        )
+        return {
+            **_participante(participante),
+            "videos": [
+                {
+                    "id": v.id, "fecha": v.fecha_subida, "url": v.url_video,
+                    "video_id": v.video_id, "miniatura": v.thumbnail_url,
+                }
+                for v in videos.filas
+            ],
+            "videos_siguiente": videos.siguiente,
+            "retos": [
+                {
+                    "id": r.id, "fecha": r.fecha, "texto": r.texto,
+                    "puntos": r.puntos, "completado": r.completado,
+                }
+                for r in retos.filas
+            ],
+            "retos_siguiente": retos.siguiente,
+        }
+
+    return _cacheado(f'api:participante:{pk}:{fragmentos.etag_datos()}', construir)
+
+
+def estado(usuario, info):
+    """Estado del usuario a partir de utils.estado_usuario (ya cacheado)."""
+    aliado = info["aliado"]
+    return {
+        "autenticado": usuario.is_authenticated,
+        "puntos": info["puntos_usuario"],
+        "aliado": {
+            "id": aliado.participante_id,
+            "nombre": aliado.participante.nombre,
+            "dias": info["dias_aliado"],
+        } if aliado else None,
+        "votados_hoy": sorted(info["votos_usuario"]),
+    }
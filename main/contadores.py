@@ -0,0 +1,97 @@
+"""
+Conciliación de los contadores desnormalizados.
+
+- Participante.votos_recibidos = nº de Voto del participante
+- Participante.puntos_totales = votos_recibidos * PUNTOS_POR_VOTO
+- ObjetivoDonacion.puntos_actuales = lo donado (DonacionUsuario) menos lo
+  que aún está en sus fracciones sin consolidar
+
+descuadres() los compara por lotes (paginación por id) con una consulta por
+lote que trae el contador y su valor real con subconsultas agrupadas, así
+ambos salen del mismo instante y nada se carga entero en memoria. corregir()
+suma la diferencia con F(): las escrituras concurrentes mueven contador y
+origen a la vez, así que la diferencia sigue siendo válida.
+"""
+from collections import defaultdict
+
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import DonacionUsuario, FraccionObjetivo, ObjetivoDonacion, Participante, Voto
+from .ranking import invalidar_ranking
+from .services import PUNTOS_POR_VOTO
+
+LOTE = 500
+
+
+def _agregado(queryset, campo, funcion):
+    """Subconsulta con el agregado de `queryset` para la fila exterior (0 si no hay)."""
+    return Coalesce(Subquery(
+        queryset.order_by().values(campo).annotate(total=funcion).values('total')
+    ), 0)
+
+
+def _participantes():
+    votos = _agregado(Voto.objects.filter(participante=OuterRef('pk')), 'participante', Count('id'))
+    return Participante.objects.annotate(
+        real_votos=votos,
+        real_puntos=votos * PUNTOS_POR_VOTO,
+    )
+
+
+def _objetivos():
+    return ObjetivoDonacion.objects.annotate(
+        real_actuales=_agregado(
+            DonacionUsuario.objects.filter(objetivo=OuterRef('pk')), 'objetivo', Sum('puntos_donados')
+        ) - _agregado(
+            FraccionObjetivo.objects.filter(objetivo=OuterRef('pk')), 'objetivo', Sum('puntos')
+        ),
+    )
+
+
+# nombre → (modelo, queryset anotado, {contador: anotación con su valor real})
+CONTADORES = {
+    'participante': (Participante, _participantes, {
+        'votos_recibidos': 'real_votos',
+        'puntos_totales': 'real_puntos',
+    }),
+    'objetivo': (ObjetivoDonacion, _objetivos, {
+        'puntos_actuales': 'real_actuales',
+    }),
+}
+
+
+def descuadres(lote=LOTE):
+    """Genera (nombre, pk, contador, valor guardado, valor real) de los que no cuadran."""
+    for nombre, (_, consulta, campos) in CONTADORES.items():
+        columnas = [c for par in campos.items() for c in par]
+        ultimo = 0
+        while filas := list(
+            consulta().filter(id__gt=ultimo).order_by('id').values_list('id', *columnas)[:lote]
+        ):
+            for pk, *valores in filas:
+                for i, campo in enumerate(campos):
+                    guardado, real = valores[2 * i], valores[2 * i + 1]
+                    if guardado != real:
+                        yield nombre, pk, campo, guardado, real
+            ultimo = filas[-1][0]
+
+
+def corregir(diferencias):
+    """
+    Aplica los descuadres de descuadres(): un UPDATE por contador e importe
+    de la diferencia, como mucho de LOTE filas cada uno. Devuelve las filas
+    corregidas.
+    """
+    por_importe = defaultdict(list)
+    for nombre, pk, campo, guardado, real in diferencias:
+        por_importe[nombre, campo, real - guardado].append(pk)
+
+    for (nombre, campo, diferencia), ids in por_importe.items():
+        modelo = CONTADORES[nombre][0]
+        for i in range(0, len(ids), LOTE):
+            modelo.objects.filter(pk__in=ids[i:i + LOTE]).update(**{campo: F(campo) + diferencia})
+
+    if any(nombre == 'participante' for nombre, _, _ in por_importe):
+        invalidar_ranking()
+    return len({(nombre, pk) for (nombre, _, _), ids in por_importe.items() for pk in ids})
@@ -0,0 +1,6 @@
+from .utils import estado_usuario
+
+
+def estado(request):
+    """Alianza, votos de hoy y puntos del usuario en todas las plantillas."""
+    return estado_usuario(request)
@@ -0,0 +1,194 @@
+import atexit
+import logging
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Encuesta, OpcionEncuesta, VotoEncuesta
+from .services import OperacionError
+
+logger = logging.getLogger(__name__)
+
+
+class EncuestaCerrada(OperacionError):
+    pass
+
+
+class VotoEncuestaDuplicado(OperacionError):
+    pass
+
+
+class Agregador:
+    """
+    Apunta en memoria qué opciones de este proceso han recibido votos y, como
+    mucho ENCUESTA_INTERVALO_VOLCADO segundos después del primero, rehace sus
+    OpcionEncuesta.votos contando VotoEncuesta (un solo UPDATE). Un
+    temporizador lanza el volcado aunque no lleguen más votos.
+
+    Los contadores se recuentan, no se suman: volcar dos veces, desde varios
+    procesos o a la vez que recalcular_encuestas no cuenta nada dos veces. Si
+    un proceso muere sin volcar, recalcular_encuestas los deja al día.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pendientes = Counter()
+        self._temporizador = None
+
+    def sumar(self, opcion_id):
+        with self._lock:
+            self._pendientes[opcion_id] += 1
+            if self._temporizador is None:
+                self._temporizador = threading.Timer(
+                    settings.ENCUESTA_INTERVALO_VOLCADO, self._volcar_programado
+                )
+                self._temporizador.daemon = True
+                self._temporizador.start()
+
+    def _volcar_programado(self):
+        try:
+            self.volcar()
+        except Exception:
+            logger.exception("No se pudieron volcar los votos de encuesta")
+        finally:
+            # el hilo del temporizador abre su propia conexión
+            connections.close_all()
+
+    def volcar(self):
+        """Recuenta las opciones con votos pendientes. Devuelve cuántos votos había."""
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, Counter()
+            if self._temporizador is not None:
+                self._temporizador.cancel()
+                self._temporizador = None
+        if not pendientes:
+            return 0
+
+        try:
+            OpcionEncuesta.objects.filter(pk__in=pendientes).update(votos=_recuento())
+        except Exception:
+            # se reintentan en el siguiente volcado
+            with self._lock:
+                self._pendientes.update(pendientes)
+            raise
+        return sum(pendientes.values())
+
+
+def _recuento():
+    """Expresión con el nº de VotoEncuesta de cada OpcionEncuesta."""
+    votos = (
+        VotoEncuesta.objects.filter(opcion=OuterRef('pk'))
+        .values('opcion').annotate(n=Count('id')).values('n')
+    )
+    return Coalesce(Subquery(votos), 0)
+
+
+agregador = Agregador()
+atexit.register(agregador.volcar)
+
+
+def _clave_definicion(encuesta_id):
+    return f'encuesta:{encuesta_id}:definicion'
+
+
+def _clave_resultados(encuesta_id):
+    return f'encuesta:{encuesta_id}:resultados'
+
+
+def definicion(encuesta_id):
+    """
+    Pregunta, si está activa y sus opciones. Se cachea sin caducidad: las
+    señales la invalidan al editar la encuesta o sus opciones.
+    """
+    datos = cache.get(_clave_definicion(encuesta_id))
+    if datos is None:
+        encuesta = Encuesta.objects.prefetch_related('opciones').filter(pk=encuesta_id).first()
+        if encuesta is None:
+            raise Encuesta.DoesNotExist
+        datos = {
+            "pregunta": encuesta.pregunta,
+            "activa": encuesta.activa,
+            "opciones": {o.id: o.texto for o in encuesta.opciones.all()},
+        }
+        cache.set(_clave_definicion(encuesta_id), datos, None)
+    return datos
+
+
+def invalidar_encuesta(encuesta_id):
+    cache.delete_many([_clave_definicion(encuesta_id), _clave_resultados(encuesta_id)])
+
+
+def votar_encuesta(usuario, encuesta_id, opcion_id):
+    """
+    Registra el voto con un único INSERT: el índice único (usuario, encuesta)
+    impide votar dos veces. El contador de la opción se recuenta por lotes.
+    """
+    datos = definicion(encuesta_id)
+    if not datos["activa"]:
+        raise EncuestaCerrada("Esta encuesta está cerrada.")
+    if opcion_id not in datos["opciones"]:
+        raise OpcionEncuesta.DoesNotExist
+
+    try:
+        with transaction.atomic():
+            VotoEncuesta.objects.create(
+                usuario=usuario, encuesta_id=encuesta_id, opcion_id=opcion_id
+            )
+            transaction.on_commit(lambda: agregador.sumar(opcion_id))
+    except IntegrityError:
+        raise VotoEncuestaDuplicado("Ya has votado en esta encuesta.")
+
+
+def resultados(encuesta_id):
+    """
+    Foto de los resultados, cacheada ENCUESTA_CACHE_RESULTADOS segundos: miles
+    de lectores cuestan una consulta por intervalo, no una cada uno. Cuenta
+    VotoEncuesta (agrupado, por el índice de encuesta) en vez de leer
+    OpcionEncuesta.votos, así no espera al volcado de ningún proceso.
+    """
+    foto = cache.get(_clave_resultados(encuesta_id))
+    if foto is None:
+        datos = definicion(encuesta_id)
+        votos = dict(
+            VotoEncuesta.objects.filter(encuesta_id=encuesta_id)
+            .values_list('opcion').annotate(Count('id')).order_by()
+        )
+        opciones = [
+            {"id": pk, "texto": texto, "votos": votos.get(pk, 0)}
+            for pk, texto in datos["opciones"].items()
+        ]
+        foto = {
+            "pregunta": datos["pregunta"],
+            "activa": datos["activa"],
+            "total": sum(o["votos"] for o in opciones),
+            "opciones": opciones,
+        }
+        cache.set(_clave_resultados(encuesta_id), foto, settings.ENCUESTA_CACHE_RESULTADOS)
+    return foto
+
+
+def recalcular_encuestas():
+    """
+    Rehace OpcionEncuesta.votos desde VotoEncuesta con un agregado agrupado.
+    Se puede lanzar con la web en marcha: los volcados de los procesos
+    también recuentan, así que no vuelven a sumar lo que ya cuenta esto.
+    """
+    reales = dict(
+        VotoEncuesta.objects.values_list('opcion').annotate(n=Count('id'))
+    )
+    corregidas = []
+    with transaction.atomic():
+        for opcion in OpcionEncuesta.objects.select_for_update().only('id', 'votos', 'encuesta_id'):
+            if opcion.votos != reales.get(opcion.id, 0):
+                opcion.votos = reales.get(opcion.id, 0)
+                corregidas.append(opcion)
+        OpcionEncuesta.objects.bulk_update(corregidas, ['votos'], batch_size=500)
+
+    for encuesta_id in {o.encuesta_id for o in corregidas}:
+        cache.delete(_clave_resultados(encuesta_id))
+    return len(corregidas)
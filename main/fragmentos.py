@@ -0,0 +1,111 @@
+"""
+Versiones de contenido para la caché de fragmentos de plantilla.
+
+Los bloques comunes a todos los visitantes (ranking, vídeos, retos,
+eliminados) se cachean con {% cache %} usando como clave la versión de sus
+datos: al cambiar los datos sube la versión y el fragmento se vuelve a
+construir una sola vez. El ranking reutiliza la versión de ranking.py, que
+ya sube con cada voto, alianza o cambio de Participante.
+
+Las mismas versiones dan el ETag/Last-Modified de las páginas públicas: un
+anónimo que recarga sin cambios recibe un 304 sin que se ejecute la vista.
+Solo con GET_CONDICIONAL (caché compartida entre procesos): con una caché
+por proceso, las versiones no suben con lo que cambian los demás.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from . import ranking
+
+VERSIONES = ('videos', 'retos')
+
+
+def _clave(nombre):
+    return f'fragmentos:{nombre}:version'
+
+
+def subir_version(nombre):
+    """Invalida los fragmentos de `nombre` (VideoTop, Reto...)."""
+    try:
+        cache.incr(_clave(nombre))
+    except ValueError:
+        # la clave nunca existió o se expulsó de la caché
+        cache.add(_clave(nombre), ranking.version_inicial(), timeout=None)
+
+
+def versiones():
+    """{nombre: versión} de todos los fragmentos, con una sola lectura de caché."""
+    claves = {_clave(n): n for n in VERSIONES}
+    leidas = cache.get_many(claves)
+    for clave in claves.keys() - leidas.keys():
+        cache.add(clave, ranking.version_inicial(), timeout=None)
+        leidas[clave] = cache.get(clave)
+
+    datos = {claves[clave]: version for clave, version in leidas.items()}
+    datos['ranking'] = ranking.version()
+    return datos
+
+
+def contexto():
+    """Lo que necesitan las plantillas para sus bloques {% cache %}."""
+    return {
+        'versiones': versiones(),
+        'fragmentos_timeout': settings.FRAGMENTOS_CACHE_TIMEOUT,
+    }
+
+
+# ───────────────────────────────
+# GET CONDICIONAL
+# ───────────────────────────────
+def etag_datos():
+    """Versión conjunta de ranking, vídeos y retos."""
+    v = versiones()
+    return f"r{v['ranking']}-v{v['videos']}-t{v['retos']}"
+
+
+def existe(pk):
+    """¿Existe el participante `pk`? Con el ranking cacheado, sin consultas."""
+    return pk is None or any(p.id == pk for p in ranking.obtener_ranking())
+
+
+def condicional(request, pk=None):
+    """¿Se puede responder 304 a esta petición? (ver GET_CONDICIONAL)"""
+    return settings.GET_CONDICIONAL and not request.user.is_authenticated and existe(pk)
+
+
+def etag_publica(request, *args, **kwargs):
+    """
+    ETag de las páginas públicas: cambia con cualquier cambio de Participante,
+    Alianza, voto, VideoTop o Reto. Solo para anónimos; con sesión la página
+    lleva datos del usuario y se genera siempre. Tampoco para un participante
+    que no existe: la vista tiene que dar su 404.
+    """
+    if not condicional(request, kwargs.get('pk')):
+        return None
+    return etag_datos()
+
+
+def modificacion_publica(request, *args, **kwargs):
+    """
+    Last-Modified de las páginas públicas: el momento en que se vio por
+    primera vez la versión actual de los datos.
+    """
+    if not condicional(request, kwargs.get('pk')):
+        return None
+    clave = f'fragmentos:modificado:{etag_datos()}'
+    cache.add(clave, timezone.now().replace(microsecond=0), settings.FRAGMENTOS_CACHE_TIMEOUT)
+    return cache.get(clave)
+
+
+def pagina_publica(vista):
+    """
+    Decorador de las páginas públicas: a los anónimos se les responde 304 si
+    los datos no han cambiado, antes de ejecutar la vista. El navegador
+    revalida siempre (no-cache) y no se guarda en cachés compartidas: la
+    página lleva el csrf del visitante.
+    """
+    vista = condition(etag_func=etag_publica, last_modified_func=modificacion_publica)(vista)
+    return cache_control(private=True, no_cache=True)(vista)
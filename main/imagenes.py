@@ -0,0 +1,77 @@
+import hashlib
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .models import Participante
+
+# Tamaños (px, cuadrados) pensados para pantallas 2x:
+# thumb = avatar del ranking (60px), card = tarjeta (120-160px), large = perfil
+VARIANTES = {
+    "thumb": 120,
+    "card": 320,
+    "large": 640,
+}
+FORMATOS = {
+    "webp": ("WEBP", {"quality": 80, "method": 6}),
+    "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+CARPETA = "participantes/variantes"
+
+
+def nombre_variante(foto_hash, variante, formato):
+    # el nombre depende del contenido: se puede cachear para siempre
+    return f"{CARPETA}/{foto_hash}-{variante}.{formato}"
+
+
+def url_variante(foto_hash, variante, formato):
+    return settings.MEDIA_URL + nombre_variante(foto_hash, variante, formato)
+
+
+def generar_variantes(nombre_foto):
+    """
+    Crea las variantes de la foto `nombre_foto` (ruta en el storage) y
+    devuelve su hash. No toca la BD, así que se puede usar en otro proceso.
+    Las variantes que ya existen no se vuelven a generar.
+    """
+    with default_storage.open(nombre_foto, "rb") as f:
+        contenido = f.read()
+    foto_hash = hashlib.sha256(contenido).hexdigest()[:20]
+
+    pendientes = [
+        (variante, formato)
+        for variante in VARIANTES
+        for formato in FORMATOS
+        if not default_storage.exists(nombre_variante(foto_hash, variante, formato))
+    ]
+    if not pendientes:
+        return foto_hash
+
+    original = ImageOps.exif_transpose(Image.open(BytesIO(contenido))).convert("RGB")
+    for variante, formato in pendientes:
+        lado = VARIANTES[variante]
+        imagen = ImageOps.fit(original, (lado, lado), Image.LANCZOS)
+
+        salida = BytesIO()
+        formato_pil, opciones = FORMATOS[formato]
+        imagen.save(salida, formato_pil, **opciones)
+        default_storage.save(
+            nombre_variante(foto_hash, variante, formato),
+            ContentFile(salida.getvalue())
+        )
+
+    return foto_hash
+
+
+def actualizar_variantes(participante):
+    """Genera las variantes de la foto actual y guarda el hash si ha cambiado."""
+    foto_hash = generar_variantes(participante.foto.name) if participante.foto else ""
+    if foto_hash != participante.foto_hash:
+        participante.foto_hash = foto_hash
+        # update() para no volver a disparar post_save
+        Participante.objects.filter(pk=participante.pk).update(foto_hash=foto_hash)
+        return True
+    return False
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from main.resumenes import LOTE, actualizar, reconstruir
+
+
+class Command(BaseCommand):
+    help = (
+        "Suma a ResumenDiario los votos y alianzas nuevos desde la última "
+        "pasada (marca de agua por id). Pensado para cron; con --reconstruir "
+        "rehace el resumen recorriendo todo el histórico por lotes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=LOTE, help="Filas por lote")
+        parser.add_argument(
+            "--reconstruir", action="store_true",
+            help="Vaciar el resumen y recalcularlo desde el principio",
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        funcion = reconstruir if options["reconstruir"] else actualizar
+        informe = funcion(options["lote"])
+
+        for fuente, filas in informe.items():
+            self.stdout.write(f"{fuente:8} {filas:>8} filas")
+        self.stdout.write(self.style.SUCCESS(
+            f"Resumen actualizado en {time.perf_counter() - inicio:.2f}s"
+        ))
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.db.backends.signals import connection_created
+
+from main.models import Participante
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el coste de abrir conexión por petición (CONN_MAX_AGE=0) frente a "
+        "conexiones persistentes, imitando el ciclo de una petición en un worker "
+        "síncrono de gunicorn (close_old_connections al empezar y al terminar)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--peticiones", type=int, default=500)
+        parser.add_argument("--conn-max-age", type=int, default=600)
+
+    def handle(self, *args, **options):
+        n = options["peticiones"]
+        original = connection.settings_dict["CONN_MAX_AGE"]
+        try:
+            for max_age in (0, options["conn_max_age"]):
+                ms, conexiones = self.medir(n, max_age)
+                self.stdout.write(
+                    f"CONN_MAX_AGE={max_age:<5} {ms:.3f} ms/petición, "
+                    f"{conexiones} conexiones abiertas en {n} peticiones "
+                    f"({connection.vendor})"
+                )
+        finally:
+            connection.close()
+            connection.settings_dict["CONN_MAX_AGE"] = original
+
+    def medir(self, n, max_age):
+        connection.close()
+        connection.settings_dict["CONN_MAX_AGE"] = max_age
+        abiertas = 0
+
+        def contar(**kwargs):
+            nonlocal abiertas
+            abiertas += 1
+
+        connection_created.connect(contar)
+        try:
+            inicio = time.perf_counter()
+            for _ in range(n):
+                close_old_connections()  # request_started
+                list(Participante.objects.values_list("id", flat=True)[:1])
+                close_old_connections()  # request_finished
+            segundos = time.perf_counter() - inicio
+        finally:
+            connection_created.disconnect(contar)
+        return segundos * 1000 / n, abiertas
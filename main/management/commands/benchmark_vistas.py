@@ -0,0 +1,145 @@
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import URLPattern, reverse
+
+from main import encuestas, fragmentos, ranking, retos, urls
+from main.models import Encuesta, ObjetivoDonacion, OpcionEncuesta, Participante, User
+from main.utils import invalidar_estado
+
+
+# Vistas que los formularios llaman por POST (y con qué datos)
+POST = {
+    "votar": {},
+    "aliarse": {},
+    "donar_puntos": {"puntos": 1},
+}
+
+
+class _Deshacer(Exception):
+    pass
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide cada URL de main/urls.py con el cliente de pruebas: latencia "
+        "(p50/p90/p99), nº de consultas SQL y tiempo SQL por vista. Escribe JSON "
+        "para poder comparar entre versiones. Las escrituras se deshacen al final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeticiones", type=int, default=20)
+        parser.add_argument("--anonimo", action="store_true", help="Sin iniciar sesión")
+        parser.add_argument("--salida", help="Fichero JSON (por defecto, stdout)")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                resultados = self.medir(options)
+                raise _Deshacer
+        except _Deshacer:
+            pass
+        self.invalidar()
+
+        informe = json.dumps(
+            {
+                "base_de_datos": connection.vendor,
+                "repeticiones": options["repeticiones"],
+                "anonimo": options["anonimo"],
+                "vistas": resultados,
+            },
+            indent=2,
+        )
+        if options["salida"]:
+            with open(options["salida"], "w") as f:
+                f.write(informe + "\n")
+        else:
+            self.stdout.write(informe)
+
+    def invalidar(self):
+        """
+        Las cachés pueden haber visto datos de la transacción deshecha. Se
+        invalida solo lo que cachean las vistas medidas, subiendo versiones o
+        borrando sus claves: un cache.clear() en una caché compartida (Redis,
+        Memcached) se llevaría también las sesiones y el resto de claves.
+        """
+        ranking.invalidar_ranking()  # también las claves api: y de fragmentos del ranking
+        for nombre in fragmentos.VERSIONES:
+            fragmentos.subir_version(nombre)
+        retos.invalidar_retos()
+        if self.argumentos["encuesta_id"]:
+            encuestas.invalidar_encuesta(self.argumentos["encuesta_id"])
+        if self.usuario:
+            invalidar_estado(self.usuario.pk)
+
+    def medir(self, options):
+        self.argumentos = argumentos = {
+            "pk": Participante.objects.values_list("id", flat=True).first(),
+            "objetivo_id": ObjetivoDonacion.objects.values_list("id", flat=True).first(),
+            "encuesta_id": Encuesta.objects.values_list("id", flat=True).first(),
+        }
+        post = dict(POST, votar_encuesta={
+            "opcion": OpcionEncuesta.objects.filter(encuesta_id=argumentos["encuesta_id"])
+            .values_list("id", flat=True).first(),
+        })
+        self.usuario = usuario = None if options["anonimo"] else User.objects.order_by("id").first()
+        cliente = Client(SERVER_NAME=settings.ALLOWED_HOSTS[0], raise_request_exception=False)
+
+        consultas, tiempo_sql = 0, 0.0
+
+        def contar(execute, sql, params, many, context):
+            nonlocal consultas, tiempo_sql
+            inicio = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                consultas += 1
+                tiempo_sql += time.perf_counter() - inicio
+
+        resultados = {}
+        for patron in urls.urlpatterns:
+            if not isinstance(patron, URLPattern):
+                continue
+            kwargs = {k: argumentos[k] for k in patron.pattern.converters}
+            if None in kwargs.values():
+                self.stderr.write(f"{patron.name}: sin datos para {list(kwargs)}, se omite")
+                continue
+            url = reverse(patron.name, kwargs=kwargs)
+
+            latencias, n_consultas, ms_sql, estados = [], [], [], set()
+            for _ in range(options["repeticiones"]):
+                if usuario:
+                    cliente.force_login(usuario)  # logout la cierra
+                consultas, tiempo_sql = 0, 0.0
+                with connection.execute_wrapper(contar):
+                    inicio = time.perf_counter()
+                    if patron.name in post:
+                        respuesta = cliente.post(url, post[patron.name])
+                    else:
+                        respuesta = cliente.get(url)
+                    latencias.append((time.perf_counter() - inicio) * 1000)
+                n_consultas.append(consultas)
+                ms_sql.append(tiempo_sql * 1000)
+                estados.add(respuesta.status_code)
+
+            resultados[patron.name] = {
+                "url": url,
+                "estados": sorted(estados),
+                "p50_ms": round(percentil(latencias, 50), 3),
+                "p90_ms": round(percentil(latencias, 90), 3),
+                "p99_ms": round(percentil(latencias, 99), 3),
+                "media_ms": round(statistics.fmean(latencias), 3),
+                "consultas": max(n_consultas),
+                "sql_ms": round(statistics.fmean(ms_sql), 3),
+            }
+        return resultados
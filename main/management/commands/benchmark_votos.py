@@ -0,0 +1,77 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from main.models import Participante, User
+from main.ranking import invalidar_ranking
+from main.services import (
+    COSTE_VOTO, encolar_voto, registrar_voto, volcar_votos_pendientes
+)
+
+
+class _Deshacer(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara la vía síncrona de votos con el modo ráfaga (cola + volcado). "
+        "Crea datos temporales dentro de una transacción que se deshace al final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--votos", type=int, default=2000)
+        parser.add_argument("--participantes", type=int, default=10)
+
+    def handle(self, *args, **options):
+        n, m = options["votos"], options["participantes"]
+        resultados = {}
+
+        for modo in ("sincrono", "rafaga"):
+            try:
+                with transaction.atomic():
+                    resultados[modo] = self._medir(modo, n, m)
+                    raise _Deshacer
+            except _Deshacer:
+                pass
+            invalidar_ranking()
+
+        for modo, (segundos, escrituras) in resultados.items():
+            self.stdout.write(
+                f"{modo:9} {n} votos en {segundos:.3f}s "
+                f"({n / segundos:.0f} votos/s), "
+                f"{escrituras} UPDATE sobre main_participante"
+            )
+
+    def _medir(self, modo, n, m):
+        participantes = Participante.objects.bulk_create(
+            Participante(nombre=f"bench-{i}") for i in range(m)
+        )
+        usuarios = User.objects.bulk_create(
+            User(username=f"bench-{i}", email=f"bench-{i}@bench.local",
+                 nickname=f"bench-{i}", puntos=COSTE_VOTO)
+            for i in range(n)
+        )
+        ids = [p.id for p in participantes]
+        invalidar_ranking()  # bulk_create no lanza señales
+
+        escrituras = 0
+
+        def contar(execute, sql, params, many, context):
+            nonlocal escrituras
+            if sql.startswith('UPDATE "main_participante"'):
+                escrituras += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(contar):
+            inicio = time.perf_counter()
+            for i, usuario in enumerate(usuarios):
+                if modo == "sincrono":
+                    registrar_voto(usuario, ids[i % m])
+                else:
+                    encolar_voto(usuario, ids[i % m])
+            while volcar_votos_pendientes():
+                pass
+            segundos = time.perf_counter() - inicio
+        return segundos, escrituras
@@ -0,0 +1,33 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.puntos import ConcesionHecha, conceder_diarios
+
+
+class Command(BaseCommand):
+    help = (
+        "Concede los puntos del día a todos los usuarios con unas pocas "
+        "sentencias INSERT ... SELECT / UPDATE (diarios, racha de aliado y "
+        "bonus por votar ayer). Es idempotente: cada día solo se concede una vez."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dia", type=date.fromisoformat,
+            help="Día de la concesión, AAAA-MM-DD (por defecto hoy)",
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        try:
+            informe = conceder_diarios(options["dia"])
+        except ConcesionHecha as e:
+            raise CommandError(str(e))
+
+        for nombre, (apuntes, segundos) in informe.items():
+            self.stdout.write(f"{nombre:8} {apuntes:>8} usuarios en {segundos * 1000:.1f} ms")
+        self.stdout.write(self.style.SUCCESS(
+            f"Concesión hecha en {time.perf_counter() - inicio:.2f}s"
+        ))
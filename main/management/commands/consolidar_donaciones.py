@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from main.services import consolidar_donaciones
+
+
+class Command(BaseCommand):
+    help = (
+        "Suma las fracciones de cada objetivo de donación a puntos_actuales y "
+        "las deja a cero. Se puede lanzar periódicamente (cron)."
+    )
+
+    def handle(self, *args, **options):
+        actualizados = consolidar_donaciones()
+        self.stdout.write(self.style.SUCCESS(f"{actualizados} objetivos consolidados"))
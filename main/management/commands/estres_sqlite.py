@@ -0,0 +1,126 @@
+import os
+import random
+import tempfile
+import threading
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+
+from core import basedatos
+from main.models import Participante, User
+from main.ranking import invalidar_ranking
+from main.services import (
+    OperacionError, encolar_voto, registrar_alianza, registrar_voto, volcar_votos_pendientes
+)
+from main.utils import invalidar_estado
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de estrés de escrituras concurrentes sobre SQLite: varios hilos "
+        "votan (también en modo ráfaga), vuelcan la cola, se alían y leen el "
+        "ranking a la vez. Compara la configuración por defecto con "
+        "SQLITE_CONCURRENTE (WAL, busy timeout, BEGIN IMMEDIATE). "
+        "Usa una base de datos temporal, no la configurada."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hilos", type=int, default=8)
+        parser.add_argument("--operaciones", type=int, default=60, help="Por hilo")
+        parser.add_argument(
+            "--timeout", type=float, default=5,
+            help="Busy timeout del modo concurrente (s)",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("Solo tiene sentido con SQLite")
+
+        modos = {
+            "por defecto": {},
+            "concurrente": basedatos.configurar(
+                None, None, sqlite_concurrente=True, sqlite_timeout=options["timeout"]
+            )["OPTIONS"],
+        }
+
+        ajustes = connections.settings["default"]
+        original = (ajustes["NAME"], ajustes.get("OPTIONS", {}))
+        try:
+            for nombre, opciones in modos.items():
+                with tempfile.TemporaryDirectory() as carpeta:
+                    connection.close()
+                    ajustes["NAME"] = os.path.join(carpeta, "estres.sqlite3")
+                    ajustes["OPTIONS"] = opciones
+                    call_command("migrate", verbosity=0)
+
+                    ok, bloqueos, segundos = self.estresar(options["hilos"], options["operaciones"])
+                    total = options["hilos"] * options["operaciones"]
+                    self.stdout.write(
+                        f"{nombre:12} {ok / segundos:8.1f} ops/s, "
+                        f"{bloqueos}/{total} ({bloqueos / total:.1%}) 'database is locked'"
+                    )
+                    connection.close()
+        finally:
+            ajustes["NAME"], ajustes["OPTIONS"] = original
+            invalidar_ranking()
+
+    def estresar(self, hilos, operaciones):
+        participantes = Participante.objects.bulk_create(
+            Participante(nombre=f"estres-{i}") for i in range(operaciones)
+        )
+        usuarios = User.objects.bulk_create(
+            User(username=f"estres-{i}", email=f"estres-{i}@estres.local",
+                 nickname=f"estres-{i}", puntos=1_000_000)
+            for i in range(hilos)
+        )
+        invalidar_ranking()
+
+        barrera = threading.Barrier(hilos)
+        cerrojo = threading.Lock()
+        contadores = {"ok": 0, "bloqueos": 0}
+
+        def trabajar(usuario, semilla):
+            rnd = random.Random(semilla)
+            try:
+                barrera.wait()
+                for participante in participantes:
+                    accion = rnd.random()
+                    try:
+                        if accion < 0.4:
+                            registrar_voto(usuario, participante.id)
+                        elif accion < 0.6:
+                            encolar_voto(usuario, participante.id)
+                        elif accion < 0.7:
+                            # lee la cola y luego escribe: el caso que bloquea
+                            volcar_votos_pendientes()
+                        elif accion < 0.8:
+                            registrar_alianza(usuario, participante)
+                        else:
+                            list(Participante.objects.order_by("-puntos_totales")[:20])
+                        resultado = "ok"
+                    except OperationalError as e:
+                        if "locked" not in str(e):
+                            raise
+                        resultado = "bloqueos"
+                    except (OperacionError, Participante.DoesNotExist):
+                        resultado = "ok"
+                    with cerrojo:
+                        contadores[resultado] += 1
+            finally:
+                connections.close_all()
+
+        inicio = time.perf_counter()
+        ejecutores = [
+            threading.Thread(target=trabajar, args=(u, n)) for n, u in enumerate(usuarios)
+        ]
+        for h in ejecutores:
+            h.start()
+        for h in ejecutores:
+            h.join()
+        segundos = time.perf_counter() - inicio
+
+        for u in usuarios:
+            invalidar_estado(u.pk)
+        return contadores["ok"], contadores["bloqueos"], segundos
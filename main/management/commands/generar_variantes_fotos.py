@@ -0,0 +1,43 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from main.imagenes import generar_variantes
+from main.models import Participante
+from main.ranking import invalidar_ranking
+
+
+class Command(BaseCommand):
+    help = "Genera las variantes (thumb/card/large, WebP y JPEG) de las fotos existentes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--procesos", type=int, default=None,
+            help="Procesos en paralelo (por defecto, uno por CPU)",
+        )
+        parser.add_argument(
+            "--todas", action="store_true",
+            help="Procesar también las que ya tienen variantes",
+        )
+
+    def handle(self, *args, **options):
+        participantes = Participante.objects.exclude(foto="").exclude(foto__isnull=True)
+        if not options["todas"]:
+            participantes = participantes.filter(foto_hash="")
+        fotos = dict(participantes.values_list("id", "foto"))
+        if not fotos:
+            self.stdout.write("No hay fotos pendientes")
+            return
+
+        # Los procesos hijos solo leen y escriben ficheros; la BD la toca
+        # únicamente este proceso, y sin conexiones abiertas heredadas.
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=options["procesos"]) as pool:
+            hashes = dict(zip(fotos, pool.map(generar_variantes, fotos.values())))
+
+        actualizados = [Participante(id=pk, foto_hash=h) for pk, h in hashes.items()]
+        Participante.objects.bulk_update(actualizados, ["foto_hash"])
+        invalidar_ranking()
+
+        self.stdout.write(self.style.SUCCESS(f"{len(actualizados)} fotos procesadas"))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from main.models import Alianza, Participante
+from main.ranking import invalidar_ranking
+
+
+class Command(BaseCommand):
+    help = "Recalcula Participante.aliados_activos a partir de las alianzas activas"
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # Un único agregado agrupado por participante
+            reales = dict(
+                Alianza.objects.filter(fecha_fin__isnull=True)
+                .values_list('participante')
+                .annotate(total=Count('id'))
+            )
+
+            corregidos = []
+            for p in Participante.objects.select_for_update().only('id', 'aliados_activos'):
+                real = reales.get(p.id, 0)
+                if p.aliados_activos != real:
+                    p.aliados_activos = real
+                    corregidos.append(p)
+
+            Participante.objects.bulk_update(corregidos, ['aliados_activos'], batch_size=500)
+
+        if corregidos:
+            invalidar_ranking()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(corregidos)} participantes corregidos"
+        ))
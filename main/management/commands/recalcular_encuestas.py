@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from main.encuestas import recalcular_encuestas
+
+
+class Command(BaseCommand):
+    help = (
+        "Rehace OpcionEncuesta.votos contando VotoEncuesta. Úsalo si un proceso "
+        "murió con votos de encuesta aún sin volcar; no hace falta parar la web."
+    )
+
+    def handle(self, *args, **options):
+        corregidas = recalcular_encuestas()
+        self.stdout.write(self.style.SUCCESS(f"{corregidas} opciones corregidas"))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from main.retos import recalcular_progreso
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye el progreso de los retos de usuario (ProgresoReto) desde "
+        "Voto y Alianza, por lotes de usuarios. Los retos que el historial "
+        "completa por primera vez se abonan; los ya completados no se tocan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=1000, help="Usuarios por lote")
+
+    def handle(self, *args, **options):
+        filas, completados = recalcular_progreso(options["lote"])
+        self.stdout.write(self.style.SUCCESS(
+            f"{filas} filas de progreso, {completados} retos completados ahora"
+        ))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from main.fragmentos import subir_version
+from main.models import VideoTop
+
+
+class Command(BaseCommand):
+    help = "Calcula video_id y thumbnail_url de los VideoTop existentes, por lotes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=500)
+        parser.add_argument(
+            "--todos", action="store_true",
+            help="Recalcular también los que ya tienen miniatura",
+        )
+
+    def handle(self, *args, **options):
+        videos = VideoTop.objects.only("id", "url_video", "video_id", "thumbnail_url")
+        if not options["todos"]:
+            videos = videos.filter(video_id="")
+
+        total, ultimo = 0, 0
+        while True:
+            # paginación por clave: cada lote es una consulta por índice
+            lote = list(videos.filter(pk__gt=ultimo).order_by("pk")[:options["lote"]])
+            if not lote:
+                break
+
+            for video in lote:
+                video.calcular_miniatura()
+            VideoTop.objects.bulk_update(lote, ["video_id", "thumbnail_url"])
+
+            total += len(lote)
+            ultimo = lote[-1].pk
+
+        subir_version("videos")  # bulk_update no lanza señales
+        self.stdout.write(self.style.SUCCESS(f"{total} vídeos procesados"))
@@ -0,0 +1,174 @@
+import random
+import time
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from main.models import (
+    Alianza, Encuesta, MovimientoPuntos, ObjetivoDonacion, OpcionEncuesta, Participante,
+    Reto, User, VideoTop, Voto
+)
+from main.fragmentos import subir_version
+from main.ranking import invalidar_ranking
+from main.services import PUNTOS_POR_VOTO
+
+CLAVE = "semilla-clave"
+
+
+def en_lotes(filas, tamano):
+    filas = iter(filas)
+    while lote := list(islice(filas, tamano)):
+        yield lote
+
+
+class Command(BaseCommand):
+    help = (
+        "Siembra datos sintéticos para pruebas de carga: usuarios, participantes "
+        "y millones de votos/alianzas/retos con bulk_create por lotes. "
+        f"Los usuarios se llaman semilla-<n> y su contraseña es '{CLAVE}'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--usuarios", type=int, default=1000)
+        parser.add_argument("--participantes", type=int, default=20)
+        parser.add_argument("--votos", type=int, default=100_000)
+        parser.add_argument("--alianzas", type=int, default=10_000)
+        parser.add_argument("--retos", type=int, default=1_000)
+        parser.add_argument("--videos", type=int, default=200)
+        parser.add_argument("--lote", type=int, default=5_000)
+        parser.add_argument("--semilla", type=int, default=1)
+
+    def handle(self, *args, **o):
+        self.rnd = random.Random(o["semilla"])
+        self.lote = o["lote"]
+        self.ahora = timezone.now()
+
+        participantes = self.sembrar(
+            "participantes", Participante, o["participantes"],
+            lambda i: Participante(nombre=f"Participante {i}"), devolver=True,
+        )
+        usuarios = self.sembrar(
+            "usuarios", User, o["usuarios"],
+            self.fabrica_usuarios(o["usuarios"]), devolver=True,
+        )
+        p_ids = [p.id for p in participantes]
+        u_ids = [u.id for u in usuarios]
+        # bulk_create no dispara la señal que apunta el saldo inicial
+        MovimientoPuntos.objects.bulk_create(
+            (MovimientoPuntos(usuario_id=u.id, cantidad=u.puntos, motivo="inicial")
+             for u in usuarios if u.puntos),
+            batch_size=self.lote,
+        )
+
+        self.sembrar("votos", Voto, o["votos"], self.fabrica_votos(u_ids, p_ids))
+        self.sembrar("alianzas", Alianza, o["alianzas"], self.fabrica_alianzas(u_ids, p_ids))
+        self.sembrar("retos", Reto, o["retos"], lambda i: Reto(
+            participante_id=self.rnd.choice(p_ids),
+            fecha=self.ahora - timedelta(minutes=i),
+            texto=f"Reto sintético {i}",
+            puntos=self.rnd.randint(0, 50),
+        ))
+        self.sembrar("vídeos", VideoTop, o["videos"], self.fabrica_videos(p_ids))
+        ObjetivoDonacion.objects.bulk_create(
+            ObjetivoDonacion(participante_id=pk, titulo=f"Objetivo {pk}") for pk in p_ids
+        )
+        encuesta = Encuesta.objects.create(pregunta="¿Quién gana esta semana?")
+        OpcionEncuesta.objects.bulk_create(
+            OpcionEncuesta(encuesta=encuesta, texto=p.nombre) for p in participantes[:4]
+        )
+
+        self.recalcular_contadores(p_ids)
+        # bulk_create no lanza señales
+        subir_version("videos")
+        subir_version("retos")
+
+    def sembrar(self, nombre, modelo, total, fabrica, devolver=False):
+        """bulk_create de `total` filas en lotes; solo guarda las creadas si `devolver`."""
+        inicio = time.perf_counter()
+        creados = []
+        for lote in en_lotes(map(fabrica, range(total)), self.lote):
+            objs = modelo.objects.bulk_create(lote)
+            if devolver:
+                creados.extend(objs)
+        self.stdout.write(f"{total:>10} {nombre} en {time.perf_counter() - inicio:.1f}s")
+        return creados
+
+    def fabrica_usuarios(self, total):
+        # el hash cuesta ~0,5s: se calcula una vez para todos
+        clave = make_password(CLAVE)
+        base = User.objects.count()
+
+        def fabrica(i):
+            n = base + i
+            return User(
+                username=f"semilla-{n}", email=f"semilla-{n}@semilla.local",
+                nickname=f"semilla-{n}", password=clave,
+                puntos=self.rnd.randint(0, 500),
+            )
+        return fabrica
+
+    def fabrica_votos(self, u_ids, p_ids):
+        # (usuario, participante, día) nunca se repite: respeta voto_unico_diario
+        hoy = timezone.localdate()
+        por_dia = len(u_ids) * len(p_ids)
+
+        def fabrica(i):
+            dia = hoy - timedelta(days=i // por_dia)
+            return Voto(
+                usuario_id=u_ids[i % len(u_ids)],
+                participante_id=p_ids[(i // len(u_ids)) % len(p_ids)],
+                fecha=self.ahora - timedelta(days=i // por_dia),
+                dia=dia,
+            )
+        return fabrica
+
+    def fabrica_alianzas(self, u_ids, p_ids):
+        # cada usuario encadena alianzas; solo la última queda abierta
+        total_usuarios = len(u_ids)
+
+        def fabrica(i):
+            ronda, usuario = divmod(i, total_usuarios)
+            inicio = self.ahora - timedelta(hours=ronda + 1)
+            return Alianza(
+                usuario_id=u_ids[usuario],
+                participante_id=self.rnd.choice(p_ids),
+                fecha_inicio=inicio,
+                fecha_fin=inicio + timedelta(hours=1) if ronda else None,
+            )
+        return fabrica
+
+    def fabrica_videos(self, p_ids):
+        def fabrica(i):
+            video = VideoTop(
+                participante_id=self.rnd.choice(p_ids),
+                fecha_subida=self.ahora - timedelta(hours=i),
+                url_video=f"https://youtu.be/sem{i:08d}",
+            )
+            video.calcular_miniatura()  # bulk_create no llama a save()
+            return video
+        return fabrica
+
+    def recalcular_contadores(self, p_ids):
+        votos = dict(
+            Voto.objects.filter(participante_id__in=p_ids)
+            .values_list("participante").annotate(n=Count("id"))
+        )
+        Participante.objects.bulk_update(
+            [
+                Participante(
+                    id=pk,
+                    votos_recibidos=votos.get(pk, 0),
+                    puntos_totales=votos.get(pk, 0) * PUNTOS_POR_VOTO,
+                )
+                for pk in p_ids
+            ],
+            ["votos_recibidos", "puntos_totales"],
+            batch_size=self.lote,
+        )
+        call_command("recalcular_aliados", stdout=self.stdout)
+        invalidar_ranking()
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from main.contadores import LOTE, corregir, descuadres
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara, por lotes, los contadores desnormalizados (votos y puntos de "
+        "Participante, puntos_actuales de ObjetivoDonacion) con su valor real "
+        "en Voto y DonacionUsuario. Con --corregir suma la diferencia."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=LOTE, help="Filas por consulta")
+        parser.add_argument("--corregir", action="store_true")
+
+    def handle(self, *args, **options):
+        diferencias = list(descuadres(options["lote"]))
+        for nombre, pk, campo, guardado, real in diferencias:
+            self.stdout.write(f"{nombre} {pk}: {campo} {guardado}, real {real}")
+
+        if not diferencias:
+            self.stdout.write(self.style.SUCCESS("Todos los contadores cuadran"))
+        elif options["corregir"]:
+            filas = corregir(diferencias)
+            self.stdout.write(self.style.SUCCESS(f"{filas} filas corregidas"))
+        else:
+            self.stdout.write(self.style.WARNING(f"{len(diferencias)} contadores descuadrados"))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from main.puntos import corregir, descuadres
+
+
+class Command(BaseCommand):
+    help = (
+        "Comprueba, por lotes de usuarios, que User.puntos coincide con la suma "
+        "de sus movimientos en el libro de puntos. Con --corregir apunta un "
+        "'ajuste' por la diferencia en cada usuario descuadrado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=500, help="Usuarios por consulta")
+        parser.add_argument("--corregir", action="store_true")
+
+    def handle(self, *args, **options):
+        total = 0
+        for usuario_id, puntos, saldo in descuadres(options["lote"]):
+            total += 1
+            self.stdout.write(f"usuario {usuario_id}: saldo {puntos}, libro {saldo}")
+            if options["corregir"]:
+                corregir(usuario_id, puntos, saldo)
+
+        if not total:
+            self.stdout.write(self.style.SUCCESS("Todos los saldos cuadran con el libro"))
+        elif options["corregir"]:
+            self.stdout.write(self.style.SUCCESS(f"{total} usuarios ajustados"))
+        else:
+            self.stdout.write(self.style.WARNING(f"{total} usuarios descuadrados"))
@@ -0,0 +1,38 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main.services import volcar_votos_pendientes
+
+
+class Command(BaseCommand):
+    help = (
+        "Vuelca los votos encolados en modo ráfaga (VotoPendiente) a Voto y "
+        "Participante. Pensado para correr como proceso aparte durante el show."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--intervalo", type=float, default=settings.VOTOS_INTERVALO_VOLCADO,
+            help="Segundos entre volcados (por defecto VOTOS_INTERVALO_VOLCADO)",
+        )
+        parser.add_argument(
+            "--una-vez", action="store_true",
+            help="Vaciar la cola una vez y salir",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            total = 0
+            while True:
+                aplicados = volcar_votos_pendientes()
+                total += aplicados
+                if aplicados < settings.VOTOS_LOTE:
+                    break
+
+            if total:
+                self.stdout.write(f"{total} votos volcados")
+            if options["una_vez"]:
+                break
+            time.sleep(options["intervalo"])
@@ -0,0 +1,75 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Tiempos acumulados de la petición en curso; None si las métricas están
+# desactivadas o no estamos dentro de una petición medida. Cada apartado
+# cuenta solo su tiempo propio: lo que se mide dentro de otro apartado (la
+# BD o el context processor de estado dentro de la plantilla) se le resta a
+# este, para que en Server-Timing no se cuente dos veces.
+_actual = ContextVar("metricas", default=None)
+
+
+def iniciar():
+    return _actual.set({"db": 0.0, "consultas": 0, "plantilla": 0.0, "estado": 0.0, "abiertos": []})
+
+
+def terminar(token):
+    datos = _actual.get()
+    _actual.reset(token)
+    return datos
+
+
+def _sumar(datos, nombre, duracion):
+    datos[nombre] += duracion
+    if datos["abiertos"]:
+        datos[datos["abiertos"][-1]] -= duracion
+
+
+@contextmanager
+def medir(nombre):
+    """Suma al apartado `nombre` el tiempo del bloque (no hace nada sin métricas)."""
+    datos = _actual.get()
+    if datos is None:
+        yield
+        return
+    datos["abiertos"].append(nombre)
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        datos["abiertos"].pop()
+        _sumar(datos, nombre, time.perf_counter() - inicio)
+
+
+def contar_consulta(execute, sql, params, many, context):
+    """execute_wrapper que acumula nº de consultas y tiempo de BD."""
+    datos = _actual.get()
+    if datos is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        _sumar(datos, "db", time.perf_counter() - inicio)
+        datos["consultas"] += 1
+
+
+_plantillas_instrumentadas = False
+
+
+def instrumentar_plantillas():
+    """Mide Template.render del backend de Django (render() de las vistas)."""
+    global _plantillas_instrumentadas
+    if _plantillas_instrumentadas:
+        return
+    from django.template.backends.django import Template
+
+    render_original = Template.render
+
+    def render(self, *args, **kwargs):
+        with medir("plantilla"):
+            return render_original(self, *args, **kwargs)
+
+    Template.render = render
+    _plantillas_instrumentadas = True
@@ -0,0 +1,63 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metricas
+
+logger = logging.getLogger("main.metricas")
+
+
+class MetricasMiddleware:
+    """
+    Mide cada petición: nº de consultas y tiempo de BD, tiempo de plantillas,
+    de get_user_status y total de la vista. Lo devuelve en la cabecera
+    Server-Timing y en una línea JSON del logger "main.metricas". Los
+    apartados no se solapan (ver metricas.py): db + plantilla + estado no
+    pasa de vista.
+
+    Con METRICAS_ACTIVAS = False Django lo quita de la cadena al arrancar.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "METRICAS_ACTIVAS", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        metricas.instrumentar_plantillas()
+
+    def __call__(self, request):
+        token = metricas.iniciar()
+        inicio = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for conexion in connections.all():
+                    stack.enter_context(conexion.execute_wrapper(metricas.contar_consulta))
+                response = self.get_response(request)
+        finally:
+            total = time.perf_counter() - inicio
+            datos = metricas.terminar(token)
+
+        ms = {k: round(datos[k] * 1000, 2) for k in ("db", "plantilla", "estado")}
+        ms["vista"] = round(total * 1000, 2)
+
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={ms["db"]};desc="{datos["consultas"]} consultas"',
+            f'plantilla;dur={ms["plantilla"]}',
+            f'estado;dur={ms["estado"]}',
+            f'vista;dur={ms["vista"]}',
+        ])
+
+        match = request.resolver_match
+        logger.info(json.dumps({
+            "ruta": request.path,
+            "vista": match.view_name if match else None,
+            "metodo": request.method,
+            "estado_http": response.status_code,
+            "consultas": datos["consultas"],
+            **{f"{k}_ms": v for k, v in ms.items()},
+        }))
+        return response
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:00
+
+from django.db import migrations, models
+from django.db.models import Count, F, Min
+from django.db.models.functions import TruncDate
+
+# Lo que costaba y sumaba cada voto al escribir esta migración (services.py)
+COSTE_VOTO = 10
+PUNTOS_POR_VOTO = 10
+
+
+def rellenar_dia(apps, schema_editor):
+    """
+    Rellena `dia` y borra los votos repetidos del mismo día. Cada voto borrado
+    se resta a su participante y se devuelve a su usuario, para que los
+    contadores y los saldos cuadren con Voto. No se puede deshacer: al volver
+    atrás los votos borrados no vuelven.
+    """
+    Voto = apps.get_model("main", "Voto")
+    Participante = apps.get_model("main", "Participante")
+    User = apps.get_model("main", "User")
+
+    # Un único UPDATE para todas las filas existentes
+    Voto.objects.update(dia=TruncDate("fecha"))
+
+    # Antes no había restricción por día: nos quedamos con el primer voto de
+    # cada (usuario, participante, dia) para poder crear la restricción única.
+    conservar = (
+        Voto.objects.values("usuario", "participante", "dia")
+        .annotate(primero=Min("id"))
+        .values_list("primero", flat=True)
+    )
+    duplicados = Voto.objects.exclude(id__in=list(conservar))
+
+    por_participante = duplicados.values_list("participante").annotate(n=Count("id")).order_by()
+    for participante_id, n in por_participante:
+        Participante.objects.filter(pk=participante_id).update(
+            votos_recibidos=F("votos_recibidos") - n,
+            puntos_totales=F("puntos_totales") - n * PUNTOS_POR_VOTO,
+        )
+    por_usuario = duplicados.values_list("usuario").annotate(n=Count("id")).order_by()
+    for usuario_id, n in por_usuario:
+        User.objects.filter(pk=usuario_id).update(puntos=F("puntos") + n * COSTE_VOTO)
+
+    borrados, _ = duplicados.delete()
+    if borrados:
+        print(f"\n  {borrados} votos repetidos borrados, restados a sus participantes y devueltos a sus usuarios")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0004_reto_completado"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="voto",
+            name="dia",
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.RunPython(rellenar_dia, migrations.RunPython.noop),
+    ]
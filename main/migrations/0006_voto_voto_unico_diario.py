@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0005_voto_dia"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="voto",
+            name="dia",
+            field=models.DateField(editable=False),
+        ),
+        migrations.AlterUniqueTogether(
+            name="voto",
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name="voto",
+            constraint=models.UniqueConstraint(
+                fields=("usuario", "dia", "participante"), name="voto_unico_diario"
+            ),
+        ),
+    ]
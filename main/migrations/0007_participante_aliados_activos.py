@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:00
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def rellenar_aliados(apps, schema_editor):
+    Participante = apps.get_model("main", "Participante")
+    Alianza = apps.get_model("main", "Alianza")
+
+    activas = (
+        Alianza.objects.filter(participante=OuterRef("pk"), fecha_fin__isnull=True)
+        .values("participante")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    Participante.objects.update(
+        aliados_activos=Coalesce(Subquery(activas, output_field=IntegerField()), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0006_voto_voto_unico_diario"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="participante",
+            name="aliados_activos",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(rellenar_aliados, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0008_votopendiente"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="videotop",
+            name="thumbnail_url",
+            field=models.URLField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="videotop",
+            name="video_id",
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0009_videotop_video_id_thumbnail_url"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="participante",
+            name="foto_hash",
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0010_participante_foto_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FraccionObjetivo",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("indice", models.PositiveSmallIntegerField()),
+                ("puntos", models.IntegerField(default=0)),
+                ("objetivo", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="fracciones", to="main.objetivodonacion")),
+            ],
+            options={
+                "unique_together": {("objetivo", "indice")},
+            },
+        ),
+    ]
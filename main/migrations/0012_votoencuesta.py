@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0011_fraccionobjetivo"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VotoEncuesta",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("fecha", models.DateTimeField(default=django.utils.timezone.now)),
+                ("encuesta", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to="main.encuesta")),
+                ("opcion", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to="main.opcionencuesta")),
+                ("usuario", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "unique_together": {("usuario", "encuesta")},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 17:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0012_votoencuesta"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProgresoReto",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("progreso", models.IntegerField(default=0)),
+                ("ultimo_dia", models.DateField(blank=True, null=True)),
+                ("completado_en", models.DateTimeField(blank=True, null=True)),
+                ("reto", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="progresos", to="main.retousuario")),
+                ("usuario", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "unique_together": {("usuario", "reto")},
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-18 18:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def saldos_iniciales(apps, schema_editor):
+    """Un apunte 'inicial' por usuario con saldo, para que el libro cuadre."""
+    User = apps.get_model("main", "User")
+    MovimientoPuntos = apps.get_model("main", "MovimientoPuntos")
+
+    saldos = User.objects.exclude(puntos=0).order_by("id").values_list("id", "puntos")
+    MovimientoPuntos.objects.bulk_create(
+        (
+            MovimientoPuntos(usuario_id=pk, cantidad=puntos, motivo="inicial")
+            for pk, puntos in saldos.iterator(chunk_size=2000)
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0013_progresoreto"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MovimientoPuntos",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("cantidad", models.IntegerField()),
+                ("motivo", models.CharField(choices=[("inicial", "Saldo inicial"), ("voto", "Voto"), ("alianza", "Alianza"), ("donacion", "Donación"), ("reembolso", "Reembolso"), ("recompensa", "Recompensa de reto"), ("concesion", "Concesión"), ("ajuste", "Ajuste")], max_length=20)),
+                ("referencia", models.CharField(blank=True, max_length=50)),
+                ("fecha", models.DateTimeField(default=django.utils.timezone.now)),
+                ("usuario", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="movimientos", to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(saldos_iniciales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0014_movimientopuntos"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ConcesionDiaria",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("dia", models.DateField(unique=True)),
+                ("fecha", models.DateTimeField(default=django.utils.timezone.now)),
+                ("movimientos", models.IntegerField(default=0)),
+                ("puntos", models.IntegerField(default=0)),
+            ],
+        ),
+    ]
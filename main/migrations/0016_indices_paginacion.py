@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0015_concesiondiaria"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="reto",
+            index=models.Index(fields=["-fecha", "-id"], name="reto_fecha_id"),
+        ),
+        migrations.AddIndex(
+            model_name="reto",
+            index=models.Index(fields=["participante", "-fecha", "-id"], name="reto_participante_fecha_id"),
+        ),
+        migrations.AddIndex(
+            model_name="videotop",
+            index=models.Index(fields=["-fecha_subida", "-id"], name="video_fecha_id"),
+        ),
+        migrations.AddIndex(
+            model_name="videotop",
+            index=models.Index(fields=["participante", "-fecha_subida", "-id"], name="video_participante_fecha_id"),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-18 21:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0016_indices_paginacion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MarcaResumen",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("fuente", models.CharField(max_length=20, unique=True)),
+                ("ultimo_id", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ResumenDiario",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("dia", models.DateField()),
+                ("votos", models.IntegerField(default=0)),
+                ("puntos", models.IntegerField(default=0)),
+                ("aliados_nuevos", models.IntegerField(default=0)),
+                ("participante", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="resumenes", to="main.participante")),
+            ],
+            options={
+                "indexes": [models.Index(fields=["dia"], name="resumen_dia_idx")],
+                "unique_together": {("participante", "dia")},
+            },
+        ),
+    ]
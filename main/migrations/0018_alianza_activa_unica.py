@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:00
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def cerrar_duplicadas(apps, schema_editor):
+    """Deja abierta solo la alianza más reciente de cada usuario."""
+    Participante = apps.get_model("main", "Participante")
+    Alianza = apps.get_model("main", "Alianza")
+
+    repetidos = (
+        Alianza.objects.filter(fecha_fin__isnull=True)
+        .values("usuario").annotate(total=Count("id")).filter(total__gt=1)
+        .values_list("usuario", flat=True)
+    )
+    for usuario_id in list(repetidos):
+        activas = Alianza.objects.filter(usuario_id=usuario_id, fecha_fin__isnull=True)
+        ultima = activas.order_by("-fecha_inicio", "-id").first()
+        activas.exclude(pk=ultima.pk).update(fecha_fin=ultima.fecha_inicio)
+
+    activas = (
+        Alianza.objects.filter(participante=OuterRef("pk"), fecha_fin__isnull=True)
+        .values("participante")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    Participante.objects.update(
+        aliados_activos=Coalesce(Subquery(activas, output_field=IntegerField()), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0017_resumendiario"),
+    ]
+
+    operations = [
+        migrations.RunPython(cerrar_duplicadas, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="alianza",
+            index=models.Index(condition=models.Q(("fecha_fin__isnull", True)), fields=["participante"], name="alianza_activa_participante"),
+        ),
+        migrations.AddConstraint(
+            model_name="alianza",
+            constraint=models.UniqueConstraint(condition=models.Q(("fecha_fin__isnull", True)), fields=("usuario",), name="alianza_activa_unica"),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0018_alianza_activa_unica"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="marcaresumen",
+            name="observado_en",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="marcaresumen",
+            name="observado_id",
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -25,6 +25,44 @@ class Perfil(models.Model):
         return self.nickname
 
 
+# ───────────────────────────────
+# LIBRO DE PUNTOS
+# ───────────────────────────────
+class MovimientoPuntos(models.Model):
+    """
+    Apunte del libro de puntos (solo se añaden, nunca se editan). User.puntos
+    es la foto del saldo: la suma de los movimientos del usuario. Ver puntos.py.
+    """
+    usuario = models.ForeignKey(User, related_name="movimientos", on_delete=models.CASCADE)
+    cantidad = models.IntegerField()  # negativa en los gastos
+    motivo = models.CharField(max_length=20, choices=[
+        ('inicial', 'Saldo inicial'),
+        ('voto', 'Voto'),
+        ('alianza', 'Alianza'),
+        ('donacion', 'Donación'),
+        ('reembolso', 'Reembolso'),
+        ('recompensa', 'Recompensa de reto'),
+        ('concesion', 'Concesión'),
+        ('ajuste', 'Ajuste'),
+    ])
+    referencia = models.CharField(max_length=50, blank=True)  # ej: "participante:3"
+    fecha = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.usuario_id}: {self.cantidad:+d} ({self.motivo})"
+
+
+class ConcesionDiaria(models.Model):
+    """Marca de que la concesión de puntos de `dia` ya se hizo (ver puntos.py)."""
+    dia = models.DateField(unique=True)
+    fecha = models.DateTimeField(default=timezone.now)
+    movimientos = models.IntegerField(default=0)
+    puntos = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.dia}: {self.movimientos} movimientos"
+
+
 # ───────────────────────────────
 # PARTICIPANTE
 # ───────────────────────────────
@@ -34,6 +72,8 @@ class Participante(models.Model):
     tiktok = models.URLField(blank=True, null=True)
     votos_recibidos = models.IntegerField(default=0)
     puntos_totales = models.IntegerField(default=0)
+    # alianzas activas (fecha_fin nula), mantenido por services.registrar_alianza
+    aliados_activos = models.IntegerField(default=0)
     eliminado = models.BooleanField(default=False)
 
     foto = models.ImageField(
@@ -41,6 +81,8 @@ class Participante(models.Model):
         blank=True,
         null=True
     )
+    # hash del contenido de `foto`; da nombre a sus variantes (ver imagenes.py)
+    foto_hash = models.CharField(max_length=64, blank=True, editable=False)
 
     def __str__(self):
         return self.nombre
@@ -57,6 +99,23 @@ class Alianza(models.Model):
 
     class Meta:
         unique_together = ('usuario', 'fecha_inicio')
+        constraints = [
+            # una sola alianza activa por usuario; el índice parcial solo
+            # guarda las activas, así "¿con quién está aliado?" es un sondeo
+            models.UniqueConstraint(
+                fields=['usuario'],
+                condition=models.Q(fecha_fin__isnull=True),
+                name='alianza_activa_unica'
+            ),
+        ]
+        indexes = [
+            # aliados activos de un participante (recalcular_aliados)
+            models.Index(
+                fields=['participante'],
+                condition=models.Q(fecha_fin__isnull=True),
+                name='alianza_activa_participante'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.usuario.username} aliado con {self.participante.nombre}"
@@ -86,8 +145,19 @@ class ObjetivoDonacion(models.Model):
     activo = models.BooleanField(default=True)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
 
+    def total(self):
+        """
+        puntos_actuales es lo ya consolidado; lo donado después está repartido
+        en FraccionObjetivo (ver services.registrar_donacion). Si la consulta trae
+        la anotación `pendientes`, no hace falta ir a la BD.
+        """
+        pendientes = getattr(self, 'pendientes', None)
+        if pendientes is None:
+            pendientes = self.fracciones.aggregate(s=models.Sum('puntos'))['s'] or 0
+        return self.puntos_actuales + pendientes
+
     def progreso(self):
-        return int((self.puntos_actuales / self.puntos_necesarios) * 100)
+        return int((self.total() / self.puntos_necesarios) * 100)
 
     def __str__(self):
         return f"{self.participante.nombre}: {self.titulo}"
@@ -101,6 +171,20 @@ class DonacionUsuario(models.Model):
     class Meta:
         unique_together = ('usuario', 'objetivo')
 
+
+class FraccionObjetivo(models.Model):
+    """
+    Una de las DONACION_FRACCIONES partes en que se reparte el contador de un
+    objetivo, para que las donaciones simultáneas no escriban todas en la
+    misma fila. consolidar_donaciones las suma a puntos_actuales.
+    """
+    objetivo = models.ForeignKey(ObjetivoDonacion, related_name="fracciones", on_delete=models.CASCADE)
+    indice = models.PositiveSmallIntegerField()
+    puntos = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('objetivo', 'indice')
+
 # ───────────────────────────────
 # VOTOS
 # ───────────────────────────────
@@ -108,14 +192,89 @@ class Voto(models.Model):
     usuario = models.ForeignKey(User, on_delete=models.CASCADE)
     participante = models.ForeignKey(Participante, on_delete=models.CASCADE)
     fecha = models.DateTimeField(default=timezone.now)
+    # día del voto materializado para poder indexarlo (fecha__date no usa índices)
+    dia = models.DateField(editable=False)
 
     class Meta:
-        unique_together = ('usuario', 'fecha')
+        constraints = [
+            # un voto por usuario, participante y día; el orden (usuario, dia, ...)
+            # también cubre "¿a quién ha votado hoy?" solo con el índice
+            models.UniqueConstraint(
+                fields=['usuario', 'dia', 'participante'],
+                name='voto_unico_diario'
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.dia is None:
+            self.dia = timezone.localdate(self.fecha)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.usuario.username} votó a {self.participante.nombre}"
 
 
+class VotoPendiente(models.Model):
+    """
+    Cola de votos aceptados en modo ráfaga (VOTOS_MODO_RAFAGA) que aún no se
+    han volcado a Voto / Participante. Ver services.volcar_votos_pendientes.
+    """
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE)
+    participante = models.ForeignKey(Participante, on_delete=models.CASCADE)
+    fecha = models.DateTimeField(default=timezone.now)
+    dia = models.DateField(editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['usuario', 'dia', 'participante'],
+                name='voto_pendiente_unico'
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.dia is None:
+            self.dia = timezone.localdate(self.fecha)
+        super().save(*args, **kwargs)
+
+
+# ───────────────────────────────
+# RESÚMENES DIARIOS
+# ───────────────────────────────
+class ResumenDiario(models.Model):
+    """
+    Votos, puntos y aliados nuevos de un participante en un día. Lo mantiene
+    resumenes.actualizar() a partir de Voto y Alianza; las tendencias y
+    gráficas leen solo de aquí.
+    """
+    participante = models.ForeignKey(Participante, related_name="resumenes", on_delete=models.CASCADE)
+    dia = models.DateField()
+    votos = models.IntegerField(default=0)
+    puntos = models.IntegerField(default=0)
+    aliados_nuevos = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('participante', 'dia')
+        indexes = [models.Index(fields=['dia'], name='resumen_dia_idx')]
+
+    def __str__(self):
+        return f"{self.participante_id} {self.dia}: {self.votos} votos"
+
+
+class MarcaResumen(models.Model):
+    """
+    Último id de `fuente` ('voto', 'alianza') ya sumado a ResumenDiario, y el
+    id más alto visto en `observado_en`, que se podrá sumar pasado el retraso.
+    """
+    fuente = models.CharField(max_length=20, unique=True)
+    ultimo_id = models.BigIntegerField(default=0)
+    observado_id = models.BigIntegerField(default=0)
+    observado_en = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.fuente}: {self.ultimo_id}"
+
+
 # ───────────────────────────────
 # RETOS
 # ───────────────────────────────
@@ -125,7 +284,14 @@ class Reto(models.Model):
     texto = models.TextField()
     puntos = models.IntegerField(default=0)
     completado = models.BooleanField(default=False)
-    
+
+    class Meta:
+        # paginación por clave (fecha, id), global y por participante
+        indexes = [
+            models.Index(fields=['-fecha', '-id'], name='reto_fecha_id'),
+            models.Index(fields=['participante', '-fecha', '-id'], name='reto_participante_fecha_id'),
+        ]
+
     def __str__(self):
         return f"Reto de {self.participante.nombre} ({self.fecha.date()})"
 
@@ -133,26 +299,50 @@ class Reto(models.Model):
 # ───────────────────────────────
 # VIDEOS TOP
 # ───────────────────────────────
+# Compilados una vez; el orden importa (v= antes que el resto)
+YOUTUBE_PATTERNS = [
+    re.compile(r"v=([A-Za-z0-9_-]+)"),
+    re.compile(r"youtu\.be/([A-Za-z0-9_-]+)"),
+    re.compile(r"shorts/([A-Za-z0-9_-]+)"),
+    re.compile(r"embed/([A-Za-z0-9_-]+)"),
+    re.compile(r"live/([A-Za-z0-9_-]+)"),
+]
+
+
+def extraer_video_id(url):
+    for pattern in YOUTUBE_PATTERNS:
+        match = pattern.search(url or "")
+        if match:
+            return match.group(1)
+    return ""
+
+
 class VideoTop(models.Model):
     participante = models.ForeignKey(Participante, on_delete=models.CASCADE)
     fecha_subida = models.DateTimeField(default=timezone.now)
     url_video = models.URLField()
-    def thumbnail(self):
-        youtube_patterns = [
-            r"v=([A-Za-z0-9_-]+)",
-            r"youtu\.be/([A-Za-z0-9_-]+)",
-            r"shorts/([A-Za-z0-9_-]+)",
-            r"embed/([A-Za-z0-9_-]+)",
-            r"live/([A-Za-z0-9_-]+)",
+    # calculados al guardar a partir de url_video (ver rellenar_miniaturas)
+    video_id = models.CharField(max_length=32, blank=True, editable=False)
+    thumbnail_url = models.URLField(blank=True, editable=False)
+
+    class Meta:
+        # paginación por clave (fecha_subida, id), global y por participante
+        indexes = [
+            models.Index(fields=['-fecha_subida', '-id'], name='video_fecha_id'),
+            models.Index(fields=['participante', '-fecha_subida', '-id'], name='video_participante_fecha_id'),
         ]
 
-        for pattern in youtube_patterns:
-            match = re.search(pattern, self.url_video)
-            if match:
-                video_id = match.group(1)
-                return f"https://img.youtube.com/vi/{video_id}/hqdefault.jpg"
+    def calcular_miniatura(self):
+        self.video_id = extraer_video_id(self.url_video)
+        if self.video_id:
+            self.thumbnail_url = f"https://img.youtube.com/vi/{self.video_id}/hqdefault.jpg"
+        else:
+            self.thumbnail_url = ""
+
+    def save(self, *args, **kwargs):
+        self.calcular_miniatura()
+        super().save(*args, **kwargs)
 
-        return None
 # ───────────────────────────────
 # ENCUESTAS
 # ───────────────────────────────
@@ -169,6 +359,17 @@ class OpcionEncuesta(models.Model):
     def __str__(self):
         return self.texto
 
+
+class VotoEncuesta(models.Model):
+    """Un voto por usuario y encuesta; OpcionEncuesta.votos se actualiza por lotes."""
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE)
+    encuesta = models.ForeignKey(Encuesta, on_delete=models.CASCADE)
+    opcion = models.ForeignKey(OpcionEncuesta, on_delete=models.CASCADE)
+    fecha = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('usuario', 'encuesta')
+
 # ───────────────────────────────
 # RETOS USUARIO
 # ───────────────────────────────
@@ -187,3 +388,25 @@ class RetoUsuario(models.Model):
 
     # param extra (ej: “3 votaciones”, “2 días”, etc)
     parametro = models.IntegerField(default=1)
+
+    def __str__(self):
+        return self.titulo
+
+
+class ProgresoReto(models.Model):
+    """
+    Progreso de un usuario en un RetoUsuario, actualizado por eventos (ver
+    retos.py). En 'constancia' `progreso` es la racha actual de días seguidos
+    votando y `ultimo_dia` el último día contado.
+    """
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE)
+    reto = models.ForeignKey(RetoUsuario, related_name="progresos", on_delete=models.CASCADE)
+    progreso = models.IntegerField(default=0)
+    ultimo_dia = models.DateField(null=True, blank=True)
+    completado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('usuario', 'reto')
+
+    def completado(self):
+        return self.completado_en is not None
@@ -0,0 +1,71 @@
+"""
+Paginación por clave (keyset) para las listas que crecen toda la temporada.
+
+En vez de OFFSET (que recorre y descarta todas las filas anteriores) cada
+página pide "las N siguientes a (fecha, id) del último elemento visto", que
+con un índice en (fecha, id) cuesta lo mismo en la página 1 que en la 500.
+El cursor viaja en la URL como "<microsegundos>.<id>".
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def codificar(fecha, pk):
+    delta = fecha - _EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return f"{micros}.{pk}"
+
+
+def decodificar(cursor):
+    try:
+        micros, pk = (int(parte) for parte in cursor.split("."))
+        if micros < 0 or pk < 0:
+            raise ValueError(cursor)
+        return _EPOCH + timedelta(microseconds=micros), pk
+    except (ValueError, OverflowError):
+        # fuera del rango de fechas, con signo o mal formado
+        raise CursorInvalido(cursor)
+
+
+class Pagina:
+    """
+    Página de `queryset` ordenada de más nueva a más vieja por (`campo`, id).
+    No consulta hasta que se leen `filas` o `siguiente`, así una página dentro
+    de un fragmento cacheado no cuesta nada si el fragmento está en caché.
+    """
+
+    def __init__(self, queryset, campo, cursor=None, tamano=None):
+        self.campo = campo
+        self.tamano = tamano or settings.PAGINA_TAMANO
+        self.queryset = queryset.order_by(f'-{campo}', '-id')
+        if cursor:
+            fecha, pk = decodificar(cursor)
+            self.queryset = self.queryset.filter(
+                Q(**{f'{campo}__lt': fecha}) | Q(**{campo: fecha, 'id__lt': pk})
+            )
+
+    @cached_property
+    def _resultado(self):
+        # una fila de más dice si hay página siguiente sin hacer COUNT
+        filas = list(self.queryset[:self.tamano + 1])
+        if len(filas) <= self.tamano:
+            return filas, None
+        filas = filas[:self.tamano]
+        return filas, codificar(getattr(filas[-1], self.campo), filas[-1].pk)
+
+    @property
+    def filas(self):
+        return self._resultado[0]
+
+    @property
+    def siguiente(self):
+        return self._resultado[1]
@@ -0,0 +1,181 @@
+"""
+Libro de puntos.
+
+Cada gasto o abono es un MovimientoPuntos que se escribe en la misma
+transacción que el cambio de User.puntos, que queda como foto del saldo:
+leer el saldo sigue siendo leer una columna. gastar() y abonar() deben
+llamarse dentro de transaction.atomic().
+"""
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import CharField, DateTimeField, F, IntegerField, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Alianza, ConcesionDiaria, MovimientoPuntos, User, Voto
+
+LOTE_USUARIOS = 500
+
+
+def gastar(usuario_id, cantidad, motivo, referencia=''):
+    """
+    Resta `cantidad` solo si hay saldo (UPDATE condicional) y lo apunta.
+    Devuelve False, sin tocar nada, si no hay saldo suficiente.
+    """
+    if not User.objects.filter(pk=usuario_id, puntos__gte=cantidad).update(
+        puntos=F('puntos') - cantidad
+    ):
+        return False
+    MovimientoPuntos.objects.create(
+        usuario_id=usuario_id, cantidad=-cantidad, motivo=motivo, referencia=referencia
+    )
+    return True
+
+
+def abonar(movimientos):
+    """
+    Aplica una lista de MovimientoPuntos (sin guardar): suma cada usuario con
+    F(), agrupando en un mismo UPDATE a los usuarios con el mismo importe, y
+    guarda los apuntes con bulk_create.
+    """
+    por_usuario = Counter()
+    for m in movimientos:
+        por_usuario[m.usuario_id] += m.cantidad
+
+    por_importe = defaultdict(list)
+    for usuario_id, cantidad in por_usuario.items():
+        por_importe[cantidad].append(usuario_id)
+
+    for cantidad, ids in por_importe.items():
+        for i in range(0, len(ids), LOTE_USUARIOS):
+            User.objects.filter(pk__in=ids[i:i + LOTE_USUARIOS]).update(
+                puntos=F('puntos') + cantidad
+            )
+    MovimientoPuntos.objects.bulk_create(movimientos, batch_size=500)
+
+
+def descuadres(lote=LOTE_USUARIOS):
+    """
+    Recorre los usuarios por lotes (paginación por id) y compara la foto
+    User.puntos con la suma de sus movimientos. Cada lote es una sola
+    consulta, así foto y suma salen del mismo instante aunque haya escrituras.
+    Genera (usuario_id, puntos, saldo_libro) de los que no cuadran.
+    """
+    ultimo = 0
+    while True:
+        filas = list(
+            User.objects.filter(id__gt=ultimo).order_by('id')
+            .annotate(saldo=Coalesce(Sum('movimientos__cantidad'), 0))
+            .values_list('id', 'puntos', 'saldo')[:lote]
+        )
+        if not filas:
+            return
+        for usuario_id, puntos, saldo in filas:
+            if puntos != saldo:
+                yield usuario_id, puntos, saldo
+        ultimo = filas[-1][0]
+
+
+def corregir(usuario_id, puntos, saldo):
+    """
+    Cuadra un usuario con un apunte de 'ajuste' por la diferencia, de modo que
+    el libro explique el saldo que el usuario ve. Los gastos y abonos
+    concurrentes mueven foto y libro a la vez, así que la diferencia no cambia.
+    """
+    MovimientoPuntos.objects.create(
+        usuario_id=usuario_id, cantidad=puntos - saldo, motivo='ajuste'
+    )
+
+
+# ───────────────────────────────
+# CONCESIÓN DIARIA
+# ───────────────────────────────
+class ConcesionHecha(Exception):
+    pass
+
+
+def _conceder(usuarios, cantidad, referencia, ahora):
+    """
+    Abona `cantidad` a los usuarios del queryset con dos sentencias, sin traer
+    filas a Python: un INSERT ... SELECT de los apuntes y un UPDATE de los
+    saldos de quienes tienen apunte nuevo con esa referencia. Así foto y libro
+    cuadran aunque la selección cambie entre una sentencia y otra.
+    """
+    ultimo = MovimientoPuntos.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+    seleccion = usuarios.order_by().annotate(
+        _cantidad=Value(cantidad, output_field=IntegerField()),
+        _motivo=Value('concesion', output_field=CharField()),
+        _referencia=Value(referencia, output_field=CharField()),
+        _fecha=Value(ahora, output_field=DateTimeField()),
+    ).values_list('id', '_cantidad', '_motivo', '_referencia', '_fecha')
+    sql, params = seleccion.query.sql_with_params()
+
+    tabla = connection.ops.quote_name(MovimientoPuntos._meta.db_table)
+    columnas = ", ".join(
+        connection.ops.quote_name(MovimientoPuntos._meta.get_field(c).column)
+        for c in ('usuario', 'cantidad', 'motivo', 'referencia', 'fecha')
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {tabla} ({columnas}) {sql}", params)
+        apuntes = cursor.rowcount
+
+    User.objects.filter(
+        pk__in=MovimientoPuntos.objects.filter(id__gt=ultimo, referencia=referencia)
+        .values('usuario_id')
+    ).update(puntos=F('puntos') + cantidad)
+    return apuntes
+
+
+def conceder_diarios(dia=None):
+    """
+    Concesión de puntos del día `dia` (por defecto hoy), pensada para cron:
+    - PUNTOS_DIARIOS a cada usuario activo
+    - PUNTOS_RACHA_ALIADO a quien lleva PUNTOS_DIAS_RACHA_ALIADO días o más
+      con su alianza actual
+    - PUNTOS_BONUS_VOTO a quien votó el día anterior
+
+    Todo va en una transacción con una ConcesionDiaria única por día: si ya
+    se hizo, lanza ConcesionHecha sin tocar nada. Devuelve
+    {concesión: (apuntes, segundos)}.
+    """
+    dia = dia or timezone.localdate()
+    ahora = timezone.now()
+    activos = User.objects.filter(is_active=True)
+
+    concesiones = [
+        ('diaria', settings.PUNTOS_DIARIOS, activos),
+        ('aliado', settings.PUNTOS_RACHA_ALIADO, activos.filter(
+            pk__in=Alianza.objects.filter(
+                fecha_fin__isnull=True,
+                fecha_inicio__lte=ahora - timedelta(days=settings.PUNTOS_DIAS_RACHA_ALIADO),
+            ).values('usuario_id')
+        )),
+        ('voto', settings.PUNTOS_BONUS_VOTO, activos.filter(
+            pk__in=Voto.objects.filter(dia=dia - timedelta(days=1)).values('usuario_id')
+        )),
+    ]
+
+    informe = {}
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                marca = ConcesionDiaria.objects.create(dia=dia, fecha=ahora)
+        except IntegrityError:
+            raise ConcesionHecha(f"La concesión del {dia} ya se hizo.")
+
+        for nombre, cantidad, usuarios in concesiones:
+            if cantidad <= 0:
+                continue
+            inicio = time.perf_counter()
+            apuntes = _conceder(usuarios, cantidad, f'{nombre}:{dia.isoformat()}', ahora)
+            informe[nombre] = (apuntes, time.perf_counter() - inicio)
+            marca.movimientos += apuntes
+            marca.puntos += apuntes * cantidad
+        marca.save(update_fields=['movimientos', 'puntos'])
+
+    return informe
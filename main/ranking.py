@@ -0,0 +1,127 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Participante
+
+# El ranking se guarda en la caché bajo una clave versionada: cambiar de
+# versión invalida la copia anterior en todos los procesos a la vez.
+VERSION_KEY = 'ranking:version'
+TIMEOUT = getattr(settings, 'RANKING_CACHE_TIMEOUT', 60)
+
+
+def version_inicial():
+    """
+    Valor con el que se (re)crea una clave de versión: si la caché la pierde,
+    la nueva versión nunca coincide con una ya usada (y publicada en un ETag).
+    """
+    return int(time.time() * 1000)
+
+
+def version():
+    actual = cache.get(VERSION_KEY)
+    if actual is None:
+        cache.add(VERSION_KEY, version_inicial(), timeout=None)
+        actual = cache.get(VERSION_KEY)
+    return actual
+
+
+def _nueva_version():
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        # la clave caducó o nunca existió
+        cache.add(VERSION_KEY, version_inicial(), timeout=None)
+        return cache.get(VERSION_KEY)
+
+
+def _clave(version):
+    return f'ranking:{version}'
+
+
+def _ordenar(participantes):
+    """Ordena por puntos y calcula posición y afinidad del público."""
+    participantes.sort(key=lambda p: (-p.puntos_totales, p.id))
+
+    top_votos = participantes[0].votos_recibidos if participantes else 0
+    for posicion, p in enumerate(participantes, start=1):
+        p.posicion = posicion
+        if top_votos > 0:
+            p.afinidad = round((p.votos_recibidos / top_votos) * 100, 2)
+        else:
+            p.afinidad = 0
+    return participantes
+
+
+def construir_ranking():
+    """Lee el ranking de la BD en una sola consulta."""
+    return _ordenar(list(Participante.objects.all()))
+
+
+def _leer(actual):
+    """(participantes, construido_en) de la copia en caché, o None si no la hay."""
+    return cache.get(_clave(actual))
+
+
+def obtener_ranking():
+    """
+    Devuelve los participantes ordenados con `posicion` y `afinidad`
+    ya calculados. Con la caché caliente no toca la BD; la copia se
+    reconstruye desde la BD cuando hace más de TIMEOUT que se construyó,
+    aunque se haya ido parcheando con votos y alianzas.
+    """
+    actual = version()
+    copia = _leer(actual)
+    if copia is None or time.time() - copia[1] >= TIMEOUT:
+        copia = (construir_ranking(), time.time())
+        cache.set(_clave(actual), copia, TIMEOUT)
+    return copia[0]
+
+
+def _aplicar(cambio):
+    """
+    Aplica `cambio(participantes_por_id)` sobre la copia en caché y la publica
+    con una versión nueva. Si no hay copia, o ya tiene más de TIMEOUT, solo
+    sube la versión: la siguiente lectura la reconstruye desde la BD. La copia
+    parcheada conserva su hora de construcción, así que lo que se pierda si
+    dos procesos parchean a la vez dura como mucho TIMEOUT.
+    """
+    copia = _leer(version())
+    restante = TIMEOUT - (time.time() - copia[1]) if copia else 0
+    if restante <= 0:
+        # sin copia que actualizar, pero los fragmentos cacheados con esta
+        # versión (ver fragmentos.py) sí han quedado viejos
+        _nueva_version()
+        return
+
+    participantes, construido_en = copia
+    cambio({p.id: p for p in participantes})
+    cache.set(
+        _clave(_nueva_version()), (_ordenar(participantes), construido_en), max(1, int(restante))
+    )
+
+
+def sumar_voto(participante_id, votos=1, puntos=0):
+    def cambio(por_id):
+        p = por_id.get(participante_id)
+        if p is not None:
+            p.votos_recibidos += votos
+            p.puntos_totales += puntos
+    _aplicar(cambio)
+
+
+def cambiar_aliado(anteriores, nuevo_id):
+    """Un usuario deja a sus aliados `anteriores` (ids) y pasa a `nuevo_id`."""
+    def cambio(por_id):
+        for participante_id in anteriores:
+            if participante_id in por_id:
+                por_id[participante_id].aliados_activos -= 1
+        if nuevo_id in por_id:
+            por_id[nuevo_id].aliados_activos += 1
+    _aplicar(cambio)
+
+
+def invalidar_ranking(**kwargs):
+    """Descarta la copia en caché (altas, bajas, eliminaciones, fotos...)."""
+    _nueva_version()
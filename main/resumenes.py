@@ -0,0 +1,187 @@
+"""
+Resumen diario por participante (ResumenDiario) para tendencias y gráficas.
+
+En vez de agrupar toda la tabla Voto cada vez que se pide una tendencia,
+actualizar() suma a ResumenDiario solo las filas de Voto y Alianza con id
+mayor que la marca de agua de cada fuente (MarcaResumen), por lotes y sin
+tocar las transacciones de voto.
+
+En PostgreSQL los ids no se confirman en orden: un voto con id bajo puede
+confirmarse después de que la marca lo haya pasado. Por eso cada pasada
+apunta el id más alto que ve (observado_id) y solo se suma hasta un id
+observado hace al menos RESUMEN_RETRASO segundos: cualquier id menor ya
+estaba asignado entonces y su transacción ha terminado desde.
+
+`manage.py actualizar_resumenes` lo lanza desde cron; con --reconstruir
+vacía el resumen y recorre todo el histórico de nuevo.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import Alianza, MarcaResumen, ResumenDiario, Voto
+from .services import PUNTOS_POR_VOTO
+
+LOTE = 5000
+
+
+def _votos(desde, hasta, lote):
+    return [
+        (pk, participante_id, dia, 1, 0)
+        for pk, participante_id, dia in Voto.objects.filter(id__gt=desde, id__lte=hasta)
+        .order_by('id').values_list('id', 'participante_id', 'dia')[:lote]
+    ]
+
+
+def _alianzas(desde, hasta, lote):
+    return [
+        (pk, participante_id, timezone.localdate(inicio), 0, 1)
+        for pk, participante_id, inicio in Alianza.objects.filter(id__gt=desde, id__lte=hasta)
+        .order_by('id').values_list('id', 'participante_id', 'fecha_inicio')[:lote]
+    ]
+
+
+# fuente → (modelo, filas (id, participante_id, dia, votos, aliados) entre dos ids)
+FUENTES = {
+    'voto': (Voto, _votos),
+    'alianza': (Alianza, _alianzas),
+}
+
+
+def _limite(fuente):
+    """
+    Id hasta el que se puede sumar `fuente` sin saltarse filas que aún no
+    se han confirmado, y nueva observación para la siguiente pasada.
+    """
+    modelo = FUENTES[fuente][0]
+    with transaction.atomic():
+        marca, _ = MarcaResumen.objects.select_for_update().get_or_create(fuente=fuente)
+        visto = modelo.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        if not settings.RESUMEN_RETRASO:
+            return visto
+
+        ahora = timezone.now()
+        limite = marca.ultimo_id
+        if marca.observado_en and ahora - marca.observado_en >= timedelta(seconds=settings.RESUMEN_RETRASO):
+            limite = max(limite, marca.observado_id)
+            marca.observado_en = None
+        if marca.observado_en is None:
+            # se guarda hasta usarla: si no, con pasadas frecuentes nunca cumpliría el retraso
+            marca.observado_id, marca.observado_en = visto, ahora
+            marca.save(update_fields=['observado_id', 'observado_en'])
+        return limite
+
+
+def _sumar_lote(fuente, hasta, lote):
+    """
+    Suma al resumen el siguiente lote de `fuente` (ids hasta `hasta`) y avanza
+    su marca en la misma transacción. Devuelve el número de filas leídas.
+    """
+    with transaction.atomic():
+        marca, _ = MarcaResumen.objects.select_for_update().get_or_create(fuente=fuente)
+        filas = FUENTES[fuente][1](marca.ultimo_id, hasta, lote)
+        if not filas:
+            return 0
+
+        sumas = defaultdict(lambda: [0, 0])
+        for _, participante_id, dia, votos, aliados in filas:
+            sumas[participante_id, dia][0] += votos
+            sumas[participante_id, dia][1] += aliados
+
+        # la marca bloqueada hace que solo un proceso escriba a la vez
+        existentes = {
+            (r.participante_id, r.dia): r
+            for r in ResumenDiario.objects.filter(
+                participante_id__in={p for p, _ in sumas},
+                dia__in={d for _, d in sumas},
+            )
+        }
+        resumenes = []
+        for (participante_id, dia), (votos, aliados) in sumas.items():
+            previo = existentes.get((participante_id, dia)) or ResumenDiario()
+            resumenes.append(ResumenDiario(
+                participante_id=participante_id, dia=dia,
+                votos=previo.votos + votos,
+                puntos=previo.puntos + votos * PUNTOS_POR_VOTO,
+                aliados_nuevos=previo.aliados_nuevos + aliados,
+            ))
+        ResumenDiario.objects.bulk_create(
+            resumenes,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['participante', 'dia'],
+            update_fields=['votos', 'puntos', 'aliados_nuevos'],
+        )
+
+        marca.ultimo_id = filas[-1][0]
+        marca.save(update_fields=['ultimo_id'])
+    return len(filas)
+
+
+def actualizar(lote=LOTE):
+    """
+    Suma al resumen todo lo nuevo desde la última pasada que ya es seguro
+    sumar (ver _limite), de `lote` en `lote` filas. Devuelve
+    {fuente: filas procesadas}.
+    """
+    informe = {}
+    for fuente in FUENTES:
+        hasta = _limite(fuente)
+        total = 0
+        while leidas := _sumar_lote(fuente, hasta, lote):
+            total += leidas
+            if leidas < lote:
+                break
+        informe[fuente] = total
+    return informe
+
+
+def reconstruir(lote=LOTE):
+    """
+    Vacía el resumen y las marcas y lo rehace desde todo el histórico. Mientras
+    dura, las tendencias muestran datos parciales; con RESUMEN_RETRASO, lo más
+    reciente se suma en las pasadas siguientes.
+    """
+    with transaction.atomic():
+        ResumenDiario.objects.all().delete()
+        MarcaResumen.objects.all().delete()
+    return actualizar(lote)
+
+
+# ───────────────────────────────
+# TENDENCIAS
+# ───────────────────────────────
+def _dias(dias, hasta):
+    hasta = hasta or timezone.localdate()
+    return [hasta - timedelta(days=i) for i in range(dias - 1, -1, -1)]
+
+
+def tendencia(participante_id, dias=30, hasta=None):
+    """
+    [(dia, votos, puntos, aliados_nuevos)] del participante en los últimos
+    `dias` días hasta `hasta` (hoy), con ceros los días sin actividad.
+    """
+    serie = _dias(dias, hasta)
+    filas = {
+        dia: datos
+        for dia, *datos in ResumenDiario.objects.filter(
+            participante_id=participante_id, dia__range=(serie[0], serie[-1])
+        ).values_list('dia', 'votos', 'puntos', 'aliados_nuevos')
+    }
+    return [(dia, *filas.get(dia, (0, 0, 0))) for dia in serie]
+
+
+def totales_por_dia(dias=30, hasta=None):
+    """Lo mismo que tendencia() sumando todos los participantes."""
+    serie = _dias(dias, hasta)
+    filas = {
+        dia: datos
+        for dia, *datos in ResumenDiario.objects.filter(dia__range=(serie[0], serie[-1]))
+        .values_list('dia').annotate(Sum('votos'), Sum('puntos'), Sum('aliados_nuevos'))
+        .order_by()
+    }
+    return [(dia, *filas.get(dia, (0, 0, 0))) for dia in serie]
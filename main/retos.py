@@ -0,0 +1,224 @@
+"""
+Motor de progreso de RetoUsuario.
+
+Cada voto o alianza es un evento que actualiza las filas ProgresoReto del
+usuario con unas pocas consultas fijas, sin recorrer su historial:
+- 'votar' y 'alianza' suman al contador
+- 'constancia' lleva la racha de días seguidos votando (+1 si el último día
+  contado fue ayer, vuelve a 1 si se cortó, nada si ya contó hoy)
+Al llegar a `parametro` el reto se marca completado con un UPDATE
+condicional, así la recompensa se abona una sola vez.
+
+`manage.py recalcular_retos` reconstruye todo desde Voto y Alianza.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Value, When
+from django.utils import timezone
+
+from . import puntos
+from .models import Alianza, MovimientoPuntos, ProgresoReto, RetoUsuario, User, Voto
+
+ACTIVOS_KEY = 'retos:activos'
+
+# Tipos de reto a los que afecta cada evento
+TIPOS_POR_EVENTO = {
+    'voto': ('votar', 'constancia'),
+    'alianza': ('alianza',),
+}
+
+
+def retos_activos():
+    """RetoUsuario activos; cacheados sin caducidad (las señales los invalidan)."""
+    retos = cache.get(ACTIVOS_KEY)
+    if retos is None:
+        retos = list(RetoUsuario.objects.filter(activo=True).order_by('id'))
+        cache.set(ACTIVOS_KEY, retos, None)
+    return retos
+
+
+def invalidar_retos():
+    cache.delete(ACTIVOS_KEY)
+
+
+def registrar_evento(usuario_id, evento, dia=None, cantidad=1):
+    """
+    Aplica un evento ('voto' o 'alianza') al progreso del usuario. Devuelve
+    los retos que ha completado este evento (ya abonados).
+    """
+    retos = [r for r in retos_activos() if r.tipo in TIPOS_POR_EVENTO[evento]]
+    if not retos:
+        return []
+    dia = dia or timezone.localdate()
+
+    with transaction.atomic():
+        ProgresoReto.objects.bulk_create(
+            [ProgresoReto(usuario_id=usuario_id, reto_id=r.id) for r in retos],
+            ignore_conflicts=True,
+        )
+        abiertos = ProgresoReto.objects.filter(usuario_id=usuario_id, completado_en__isnull=True)
+
+        contadores = [r.id for r in retos if r.tipo != 'constancia']
+        if contadores:
+            abiertos.filter(reto_id__in=contadores).update(progreso=F('progreso') + cantidad)
+
+        rachas = [r.id for r in retos if r.tipo == 'constancia']
+        if rachas:
+            abiertos.filter(reto_id__in=rachas).filter(
+                Q(ultimo_dia__isnull=True) | Q(ultimo_dia__lt=dia)
+            ).update(
+                progreso=Case(
+                    When(ultimo_dia=dia - timedelta(days=1), then=F('progreso') + 1),
+                    default=Value(1),
+                ),
+                ultimo_dia=dia,
+            )
+
+        return _completar(usuario_id, retos)
+
+
+def _completar(usuario_id, retos):
+    """Marca como completados los retos que han llegado a su parámetro y abona."""
+    por_id = {r.id: r for r in retos}
+    candidatos = ProgresoReto.objects.filter(
+        usuario_id=usuario_id, reto_id__in=por_id, completado_en__isnull=True
+    ).values_list('id', 'reto_id', 'progreso')
+
+    ahora = timezone.now()
+    completados = []
+    for pk, reto_id, progreso in candidatos:
+        if progreso < por_id[reto_id].parametro:
+            continue
+        # condicional: si otra petición lo completó antes, no se abona dos veces
+        if ProgresoReto.objects.filter(pk=pk, completado_en__isnull=True).update(completado_en=ahora):
+            completados.append(por_id[reto_id])
+
+    puntos.abonar([_recompensa(usuario_id, r) for r in completados])
+    return completados
+
+
+def _recompensa(usuario_id, reto):
+    return MovimientoPuntos(
+        usuario_id=usuario_id, cantidad=reto.puntos_recompensa,
+        motivo='recompensa', referencia=f'reto:{reto.id}',
+    )
+
+
+def progreso_usuario(usuario):
+    """
+    [(reto, progreso, completado)] de los retos activos: una consulta. Vacía
+    para anónimos, que no tienen progreso que enseñar.
+    """
+    if not usuario.is_authenticated:
+        return []
+    retos = retos_activos()
+    if not retos:
+        return []
+
+    filas = {
+        reto_id: (min(progreso, parametro), completado_en is not None)
+        for reto_id, progreso, parametro, completado_en in ProgresoReto.objects.filter(
+            usuario=usuario, reto_id__in=[r.id for r in retos]
+        ).values_list('reto_id', 'progreso', 'reto__parametro', 'completado_en')
+    }
+    return [(r, *filas.get(r.id, (0, False))) for r in retos]
+
+
+# ───────────────────────────────
+# RECÁLCULO COMPLETO
+# ───────────────────────────────
+def _rachas(dias):
+    """(racha actual, racha máxima) de una lista ordenada de días distintos."""
+    actual = maxima = 0
+    anterior = None
+    for dia in dias:
+        actual = actual + 1 if anterior and dia - anterior == timedelta(days=1) else 1
+        maxima = max(maxima, actual)
+        anterior = dia
+    return actual, maxima
+
+
+def recalcular_progreso(lote=1000):
+    """
+    Reconstruye ProgresoReto desde Voto y Alianza, de `lote` en `lote`
+    usuarios. Los retos ya completados se respetan; los que el historial
+    completa por primera vez se marcan y se abonan. Devuelve
+    (filas escritas, retos completados ahora).
+    """
+    retos = retos_activos()
+    if not retos:
+        return 0, 0
+
+    escritas = completados = 0
+    ultimo = 0
+    while usuarios := list(
+        User.objects.filter(id__gt=ultimo).order_by('id').values_list('id', flat=True)[:lote]
+    ):
+        e, c = _recalcular_lote(usuarios, retos)
+        escritas += e
+        completados += c
+        ultimo = usuarios[-1]
+    return escritas, completados
+
+
+def _recalcular_lote(usuarios, retos):
+    votos = dict(
+        Voto.objects.filter(usuario_id__in=usuarios)
+        .values_list('usuario').annotate(n=Count('id')).order_by()
+    )
+    alianzas = dict(
+        Alianza.objects.filter(usuario_id__in=usuarios)
+        .values_list('usuario').annotate(n=Count('id')).order_by()
+    )
+    dias = defaultdict(list)
+    for usuario_id, dia in (
+        Voto.objects.filter(usuario_id__in=usuarios)
+        .values_list('usuario_id', 'dia').distinct().order_by('usuario_id', 'dia')
+        .iterator(chunk_size=5000)
+    ):
+        dias[usuario_id].append(dia)
+
+    ahora = timezone.now()
+    with transaction.atomic():
+        existentes = {
+            (p.usuario_id, p.reto_id): p.completado_en
+            for p in ProgresoReto.objects.filter(usuario_id__in=usuarios).only(
+                'usuario_id', 'reto_id', 'completado_en'
+            )
+        }
+
+        filas, recompensas = [], []
+        for usuario_id in usuarios:
+            racha, racha_maxima = _rachas(dias.get(usuario_id, []))
+            for r in retos:
+                if r.tipo == 'constancia':
+                    progreso, alcanzado = racha, racha_maxima >= r.parametro
+                else:
+                    progreso = (votos if r.tipo == 'votar' else alianzas).get(usuario_id, 0)
+                    alcanzado = progreso >= r.parametro
+                if not progreso and (usuario_id, r.id) not in existentes:
+                    continue
+
+                completado_en = existentes.get((usuario_id, r.id))
+                if completado_en is None and alcanzado:
+                    completado_en = ahora
+                    recompensas.append(_recompensa(usuario_id, r))
+                filas.append(ProgresoReto(
+                    usuario_id=usuario_id, reto_id=r.id, progreso=progreso,
+                    ultimo_dia=dias[usuario_id][-1] if r.tipo == 'constancia' and progreso else None,
+                    completado_en=completado_en,
+                ))
+
+        ProgresoReto.objects.bulk_create(
+            filas,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['usuario', 'reto'],
+            update_fields=['progreso', 'ultimo_dia', 'completado_en'],
+        )
+        puntos.abonar(recompensas)
+
+    return len(filas), sum(1 for f in filas if f.completado_en == ahora)
@@ -0,0 +1,394 @@
+import random
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import (
+    Alianza, DonacionUsuario, FraccionObjetivo, MovimientoPuntos, ObjetivoDonacion,
+    Participante, Voto, VotoPendiente
+)
+from . import puntos, ranking, retos
+from .utils import invalidar_estado
+
+COSTE_VOTO = 10
+PUNTOS_POR_VOTO = 10  # lo que suma cada voto al participante
+COSTE_ALIANZA = 50
+
+
+class OperacionError(Exception):
+    """Error de negocio en un voto/alianza (el mensaje se muestra al usuario)."""
+
+
+class PuntosInsuficientes(OperacionError):
+    pass
+
+
+class VotoDuplicado(OperacionError):
+    pass
+
+
+class ObjetivoCerrado(OperacionError):
+    pass
+
+
+def registrar_voto(usuario, participante_id):
+    """
+    Registra el voto de `usuario` a un participante en una sola transacción:
+    - resta COSTE_VOTO al usuario solo si tiene saldo (UPDATE condicional)
+      y lo apunta en el libro de puntos
+    - crea el Voto; la restricción única (usuario, dia, participante) hace
+      de comprobación de "ya votó hoy" sin consultas previas
+    - suma votos/puntos al participante con aritmética en la BD (F())
+
+    Siempre son las mismas 4 consultas, haya o no concurrencia, y nunca
+    se pierden incrementos porque nada se lee para luego sobrescribirse.
+    Lanza Participante.DoesNotExist si el participante no existe.
+    """
+    ahora = timezone.now()
+
+    with transaction.atomic():
+        # 1. Restar puntos solo si hay saldo suficiente
+        restado = puntos.gastar(
+            usuario.pk, COSTE_VOTO, 'voto', f'participante:{participante_id}'
+        )
+        if not restado:
+            raise PuntosInsuficientes("No tienes puntos suficientes para votar.")
+
+        # 2. Registrar el voto (falla si ya votó hoy a este participante)
+        try:
+            Voto.objects.create(
+                usuario=usuario,
+                participante_id=participante_id,
+                fecha=ahora
+            )
+        except IntegrityError:
+            raise VotoDuplicado("Ya votaste hoy a este participante.")
+
+        # 3. Sumar al participante (si no existe se deshace todo)
+        actualizado = Participante.objects.filter(pk=participante_id).update(
+            votos_recibidos=F('votos_recibidos') + 1,
+            puntos_totales=F('puntos_totales') + PUNTOS_POR_VOTO,
+        )
+        if not actualizado:
+            raise Participante.DoesNotExist
+
+        transaction.on_commit(
+            lambda: ranking.sumar_voto(participante_id, votos=1, puntos=PUNTOS_POR_VOTO)
+        )
+        transaction.on_commit(lambda: invalidar_estado(usuario.pk))
+        # progreso de retos fuera de la transacción caliente del voto
+        transaction.on_commit(lambda: retos.registrar_evento(usuario.pk, 'voto'))
+
+    usuario.puntos -= COSTE_VOTO
+    return ahora
+
+
+# ───────────────────────────────
+# MODO RÁFAGA (write-behind)
+# ───────────────────────────────
+ULTIMO_VOLCADO_KEY = 'votos:ultimo_volcado'
+
+
+def encolar_voto(usuario, participante_id):
+    """
+    Variante de registrar_voto para picos de tráfico: cobra y valida igual,
+    pero deja el voto en VotoPendiente en lugar de escribir en Participante.
+    Las filas calientes de Participante solo se tocan al volcar el lote.
+    """
+    # Participantes válidos desde el ranking cacheado (sin consulta)
+    if participante_id not in {p.id for p in ranking.obtener_ranking()}:
+        raise Participante.DoesNotExist
+
+    ahora = timezone.now()
+    hoy = timezone.localdate(ahora)
+
+    with transaction.atomic():
+        # 1. Restar puntos solo si hay saldo suficiente
+        restado = puntos.gastar(
+            usuario.pk, COSTE_VOTO, 'voto', f'participante:{participante_id}'
+        )
+        if not restado:
+            raise PuntosInsuficientes("No tienes puntos suficientes para votar.")
+
+        # 2. Ya volcado hoy (sondeo del índice único de Voto) o ya en la cola
+        if Voto.objects.filter(
+            usuario=usuario, dia=hoy, participante_id=participante_id
+        ).exists():
+            raise VotoDuplicado("Ya votaste hoy a este participante.")
+        try:
+            VotoPendiente.objects.create(
+                usuario=usuario,
+                participante_id=participante_id,
+                fecha=ahora
+            )
+        except IntegrityError:
+            raise VotoDuplicado("Ya votaste hoy a este participante.")
+
+        transaction.on_commit(lambda: invalidar_estado(usuario.pk))
+
+    usuario.puntos -= COSTE_VOTO
+
+    # Si el volcador no ha pasado en VOTOS_RETRASO_MAXIMO, vuelca esta petición
+    ultimo = cache.get(ULTIMO_VOLCADO_KEY)
+    if ultimo is None or (ahora - ultimo).total_seconds() > settings.VOTOS_RETRASO_MAXIMO:
+        volcar_votos_pendientes()
+
+    return ahora
+
+
+def volcar_votos_pendientes(lote=None):
+    """
+    Aplica un lote de VotoPendiente en una transacción: un bulk_create de Voto
+    y un único UPDATE por participante con la suma del lote. Los votos que ya
+    existían en Voto (p.ej. por la vía síncrona) se descartan y se devuelven
+    los puntos con un apunte de 'reembolso'. Devuelve el número de votos aplicados.
+    """
+    lote = lote or settings.VOTOS_LOTE
+    cache.set(ULTIMO_VOLCADO_KEY, timezone.now(), None)
+
+    with transaction.atomic():
+        pendientes = list(
+            VotoPendiente.objects
+            .select_for_update(skip_locked=True)
+            .order_by('id')[:lote]
+        )
+        if not pendientes:
+            return 0
+
+        existentes = set(
+            Voto.objects.filter(
+                usuario_id__in={v.usuario_id for v in pendientes},
+                dia__in={v.dia for v in pendientes},
+            ).values_list('usuario_id', 'dia', 'participante_id')
+        )
+
+        nuevos, repetidos = [], []
+        for v in pendientes:
+            if (v.usuario_id, v.dia, v.participante_id) in existentes:
+                repetidos.append(v)
+            else:
+                nuevos.append(Voto(
+                    usuario_id=v.usuario_id,
+                    participante_id=v.participante_id,
+                    fecha=v.fecha,
+                    dia=v.dia,
+                ))
+
+        Voto.objects.bulk_create(nuevos, batch_size=500)
+
+        # Una sola escritura por participante y lote
+        por_participante = Counter(v.participante_id for v in nuevos)
+        for participante_id, votos in por_participante.items():
+            Participante.objects.filter(pk=participante_id).update(
+                votos_recibidos=F('votos_recibidos') + votos,
+                puntos_totales=F('puntos_totales') + votos * PUNTOS_POR_VOTO,
+            )
+
+        puntos.abonar([
+            MovimientoPuntos(
+                usuario_id=v.usuario_id, cantidad=COSTE_VOTO, motivo='reembolso',
+                referencia=f'participante:{v.participante_id}',
+            )
+            for v in repetidos
+        ])
+
+        VotoPendiente.objects.filter(id__in=[v.id for v in pendientes]).delete()
+
+        eventos = Counter((v.usuario_id, v.dia) for v in nuevos)
+
+        def publicar():
+            for participante_id, votos in por_participante.items():
+                ranking.sumar_voto(participante_id, votos=votos, puntos=votos * PUNTOS_POR_VOTO)
+            for usuario_id in {v.usuario_id for v in repetidos}:
+                invalidar_estado(usuario_id)
+            for (usuario_id, dia), votos in sorted(eventos.items()):
+                retos.registrar_evento(usuario_id, 'voto', dia, votos)
+        transaction.on_commit(publicar)
+
+    return len(nuevos)
+
+
+def registrar_alianza(usuario, participante):
+    """
+    Cambia el aliado de `usuario` a `participante` en una sola transacción:
+    cobra COSTE_ALIANZA (UPDATE condicional), cierra la alianza activa,
+    crea la nueva y mantiene `aliados_activos` de ambos participantes.
+
+    El UPDATE del cobro bloquea la fila del usuario, así que dos clics
+    simultáneos del mismo usuario se hacen uno detrás de otro; la restricción
+    alianza_activa_unica garantiza además una sola alianza activa.
+    """
+    ahora = timezone.now()
+
+    with transaction.atomic():
+        # 1. Restar puntos solo si hay saldo suficiente
+        restado = puntos.gastar(
+            usuario.pk, COSTE_ALIANZA, 'alianza', f'participante:{participante.pk}'
+        )
+        if not restado:
+            raise PuntosInsuficientes("No tienes puntos suficientes para aliarte.")
+
+        # 2. Cerrar la alianza actual y descontar a ese participante
+        actuales = Alianza.objects.filter(usuario=usuario, fecha_fin__isnull=True)
+        anteriores = list(actuales.values_list('participante_id', flat=True))
+        if anteriores:
+            actuales.update(fecha_fin=ahora)
+            for participante_id in set(anteriores):
+                Participante.objects.filter(pk=participante_id).update(
+                    aliados_activos=F('aliados_activos') - anteriores.count(participante_id)
+                )
+
+        # 3. Crear nueva alianza (falla si otra quedó activa a la vez)
+        try:
+            Alianza.objects.create(
+                usuario=usuario,
+                participante=participante,
+                fecha_inicio=ahora
+            )
+        except IntegrityError:
+            raise OperacionError("Tu alianza acaba de cambiar, inténtalo de nuevo.")
+        Participante.objects.filter(pk=participante.pk).update(
+            aliados_activos=F('aliados_activos') + 1
+        )
+
+        transaction.on_commit(
+            lambda: ranking.cambiar_aliado(anteriores, participante.pk)
+        )
+        transaction.on_commit(lambda: invalidar_estado(usuario.pk))
+        transaction.on_commit(lambda: retos.registrar_evento(usuario.pk, 'alianza'))
+
+    usuario.puntos -= COSTE_ALIANZA
+
+
+# ───────────────────────────────
+# DONACIONES
+# ───────────────────────────────
+def objetivos_con_total():
+    """ObjetivoDonacion con la suma de sus fracciones ya anotada (ver total())."""
+    return ObjetivoDonacion.objects.annotate(
+        pendientes=Coalesce(Sum('fracciones__puntos'), 0)
+    )
+
+
+def cerrar_completados(objetivo_id=None):
+    """
+    Cierra los objetivos activos (o solo `objetivo_id`) cuyo total ya llega a
+    la meta, con un único UPDATE condicionado a activo=True. Devuelve cuántos
+    ha cerrado.
+    """
+    pendientes = (
+        FraccionObjetivo.objects.filter(objetivo=OuterRef('pk'))
+        .values('objetivo').annotate(suma=Sum('puntos')).values('suma')
+    )
+    objetivos = ObjetivoDonacion.objects.filter(activo=True)
+    if objetivo_id is not None:
+        objetivos = objetivos.filter(pk=objetivo_id)
+    return objetivos.filter(
+        puntos_necesarios__lte=F('puntos_actuales') + Coalesce(Subquery(pendientes), 0)
+    ).update(activo=False)
+
+
+def registrar_donacion(usuario, objetivo_id, cantidad):
+    """
+    Dona `cantidad` puntos a un objetivo en una sola transacción:
+    - resta los puntos solo si hay saldo (UPDATE condicional)
+    - suma a DonacionUsuario con F()
+    - suma a una fracción al azar del objetivo, no a la fila del objetivo
+    - si con esto se alcanza la meta, lo cierra con un UPDATE condicionado a
+      activo=True: solo una donación puede cerrarlo
+    - si no, lo vuelve a comprobar tras el commit (cerrar_completados): en
+      PostgreSQL las últimas donaciones simultáneas no ven las fracciones de
+      las demás hasta que confirman, y ninguna llegaría a cerrarlo. Si aun así
+      se escapa, consolidar_donaciones lo cierra en su siguiente pasada
+
+    Devuelve True si esta donación ha completado el objetivo.
+    Lanza ObjetivoDonacion.DoesNotExist si el objetivo no existe.
+    """
+    if cantidad <= 0:
+        raise OperacionError("Debes donar una cantidad válida.")
+
+    with transaction.atomic():
+        # 1. Consumir puntos del usuario
+        restado = puntos.gastar(usuario.pk, cantidad, 'donacion', f'objetivo:{objetivo_id}')
+        if not restado:
+            raise PuntosInsuficientes("No tienes suficientes puntos.")
+
+        # 2. Registrar donación
+        if not DonacionUsuario.objects.filter(usuario=usuario, objetivo_id=objetivo_id).update(
+            puntos_donados=F('puntos_donados') + cantidad
+        ):
+            try:
+                with transaction.atomic():
+                    DonacionUsuario.objects.create(
+                        usuario=usuario, objetivo_id=objetivo_id, puntos_donados=cantidad
+                    )
+            except IntegrityError:
+                # otra petición del mismo usuario la creó a la vez
+                DonacionUsuario.objects.filter(usuario=usuario, objetivo_id=objetivo_id).update(
+                    puntos_donados=F('puntos_donados') + cantidad
+                )
+
+        # 3. Sumar a una fracción del objetivo (se crean la primera vez)
+        fraccion = FraccionObjetivo.objects.filter(
+            objetivo_id=objetivo_id,
+            indice=random.randrange(settings.DONACION_FRACCIONES)
+        )
+        if not fraccion.update(puntos=F('puntos') + cantidad):
+            FraccionObjetivo.objects.bulk_create(
+                [
+                    FraccionObjetivo(objetivo_id=objetivo_id, indice=i)
+                    for i in range(settings.DONACION_FRACCIONES)
+                ],
+                ignore_conflicts=True
+            )
+            fraccion.update(puntos=F('puntos') + cantidad)
+
+        # 4. ¿Sigue abierto? ¿Lo completa esta donación?
+        objetivo = objetivos_con_total().filter(pk=objetivo_id).first()
+        if objetivo is None:
+            raise ObjetivoDonacion.DoesNotExist
+        if not objetivo.activo:
+            raise ObjetivoCerrado("Este objetivo ya está completado.")
+
+        completado = False
+        total = objetivo.total()
+        if total >= objetivo.puntos_necesarios:
+            completado = bool(
+                ObjetivoDonacion.objects.filter(pk=objetivo_id, activo=True).update(activo=False)
+            )
+        else:
+            transaction.on_commit(lambda: cerrar_completados(objetivo_id))
+
+    usuario.puntos -= cantidad
+    return completado
+
+
+def consolidar_donaciones():
+    """
+    Pasa lo acumulado en las fracciones a ObjetivoDonacion.puntos_actuales y
+    las deja a cero, y cierra los objetivos que ya llegan a la meta y siguen
+    activos. Devuelve el número de objetivos actualizados.
+    """
+    with transaction.atomic():
+        fracciones = list(
+            FraccionObjetivo.objects.select_for_update()
+            .exclude(puntos=0)
+            .values_list('id', 'objetivo_id', 'puntos')
+        )
+        sumas = Counter()
+        for _, objetivo_id, suma in fracciones:
+            sumas[objetivo_id] += suma
+
+        for objetivo_id, suma in sumas.items():
+            ObjetivoDonacion.objects.filter(pk=objetivo_id).update(
+                puntos_actuales=F('puntos_actuales') + suma
+            )
+        FraccionObjetivo.objects.filter(id__in=[f[0] for f in fracciones]).update(puntos=0)
+        cerrar_completados()
+
+    return len(sumas)
@@ -0,0 +1,76 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .encuestas import invalidar_encuesta
+from .fragmentos import subir_version
+from .imagenes import actualizar_variantes
+from .models import Encuesta, MovimientoPuntos, OpcionEncuesta, Participante, Reto, RetoUsuario, User, VideoTop
+from .ranking import invalidar_ranking
+from .retos import invalidar_retos
+
+
+@receiver(post_init, sender=Participante)
+def participante_cargado(sender, instance, **kwargs):
+    # nombre de la foto tal como se cargó; __dict__ para no leer `foto` si es diferida
+    foto = instance.__dict__.get('foto')
+    instance._foto_guardada = getattr(foto, 'name', foto)
+
+
+def _foto_cambiada(instance, created, update_fields):
+    if created:
+        return True
+    if update_fields is not None and 'foto' not in update_fields:
+        return False
+    # sin hash aún (p. ej. falló la última vez) también se regenera
+    return instance.foto.name != instance._foto_guardada or bool(instance.foto and not instance.foto_hash)
+
+
+# Cambios hechos desde el admin (altas, eliminaciones, fotos...)
+@receiver(post_save, sender=Participante)
+def participante_guardado(sender, instance, created, update_fields, **kwargs):
+    # solo se vuelve a leer y hashear la foto si ha cambiado
+    if _foto_cambiada(instance, created, update_fields):
+        try:
+            actualizar_variantes(instance)
+        except OSError:
+            # foto ilegible o ausente: las plantillas usan la original
+            pass
+        instance._foto_guardada = instance.foto.name
+    invalidar_ranking()
+
+
+@receiver(post_delete, sender=Participante)
+def participante_borrado(sender, **kwargs):
+    invalidar_ranking()
+
+
+@receiver([post_save, post_delete], sender=Encuesta)
+def encuesta_cambiada(sender, instance, **kwargs):
+    invalidar_encuesta(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=OpcionEncuesta)
+def opcion_cambiada(sender, instance, **kwargs):
+    invalidar_encuesta(instance.encuesta_id)
+
+
+@receiver([post_save, post_delete], sender=RetoUsuario)
+def reto_usuario_cambiado(sender, **kwargs):
+    invalidar_retos()
+
+
+@receiver(post_save, sender=User)
+def usuario_creado(sender, instance, created, **kwargs):
+    # el saldo con el que nace un usuario también queda en el libro
+    if created and instance.puntos:
+        MovimientoPuntos.objects.create(usuario=instance, cantidad=instance.puntos, motivo='inicial')
+
+
+@receiver([post_save, post_delete], sender=VideoTop)
+def video_cambiado(sender, **kwargs):
+    subir_version('videos')
+
+
+@receiver([post_save, post_delete], sender=Reto)
+def reto_cambiado(sender, **kwargs):
+    subir_version('retos')
@@ -0,0 +1,18 @@
+from django import template
+
+from main.imagenes import url_variante
+
+register = template.Library()
+
+
+@register.inclusion_tag("main/foto.html")
+def foto(participante, variante, clase=""):
+    """
+    <picture> con la variante WebP/JPEG de la foto del participante, o la
+    foto original si aún no tiene variantes generadas.
+    """
+    contexto = {"p": participante, "clase": clase}
+    if participante.foto_hash:
+        contexto["webp"] = url_variante(participante.foto_hash, variante, "webp")
+        contexto["jpg"] = url_variante(participante.foto_hash, variante, "jpg")
+    return contexto
@@ -12,5 +12,12 @@ urlpatterns = [
     path('aliarse/<int:pk>/', views.aliarse, name='aliarse'),
     path("playground/", views.playground, name="playground"),
     path("donar/<int:objetivo_id>/", views.donar_puntos, name="donar_puntos"),
+    path("videos/mas/", views.mas_videos, name="mas_videos"),
+    path("retos/mas/", views.mas_retos, name="mas_retos"),
+    path("encuesta/<int:encuesta_id>/votar/", views.votar_encuesta, name="votar_encuesta"),
+    path("encuesta/<int:encuesta_id>/resultados/", views.resultados_encuesta, name="resultados_encuesta"),
+    path("api/ranking/", views.api_ranking, name="api_ranking"),
+    path("api/participante/<int:pk>/", views.api_participante, name="api_participante"),
+    path("api/estado/", views.api_estado, name="api_estado"),
 
 ]
@@ -1,6 +1,47 @@
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
-from .models import Alianza, Voto, User
-from datetime import datetime
+from .models import Alianza, Voto, VotoPendiente
+from . import metricas, ranking
+
+ESTADO_TIMEOUT = getattr(settings, 'ESTADO_USUARIO_CACHE_TIMEOUT', 300)
+
+
+def _clave_estado(user_id, hoy):
+    # el día va en la clave: a medianoche los votos "de hoy" empiezan vacíos
+    return f'estado:{user_id}:{hoy.isoformat()}'
+
+
+def invalidar_estado(user_id):
+    """Borra el estado cacheado del usuario (tras votar o cambiar de aliado)."""
+    cache.delete(_clave_estado(user_id, timezone.localdate()))
+
+
+def _leer_estado(user, hoy):
+    """Alianza activa y participantes votados hoy: 2 consultas, cacheadas."""
+    clave = _clave_estado(user.pk, hoy)
+    estado = cache.get(clave)
+    if estado is None:
+        estado = {
+            "aliado": (
+                Alianza.objects
+                .select_related('participante')
+                .filter(usuario=user, fecha_fin__isnull=True)
+                .first()
+            ),
+            # incluye los votos aún en cola del modo ráfaga
+            "votados": set(
+                Voto.objects.filter(usuario=user, dia=hoy)
+                .values_list('participante_id', flat=True)
+                .union(
+                    VotoPendiente.objects.filter(usuario=user, dia=hoy)
+                    .values_list('participante_id', flat=True)
+                )
+            ),
+        }
+        cache.set(clave, estado, ESTADO_TIMEOUT)
+    return estado
+
 
 def get_user_status(user):
     """
@@ -12,30 +53,27 @@ def get_user_status(user):
     - días aliado
     """
 
-    hoy = timezone.now().date()
+    hoy = timezone.localdate()
 
-    # 1. Obtener alianza activa
+    # 1. Obtener alianza activa y votos del día (desde la caché)
     aliado = None
     dias_aliado = 0
+    votos_usuario = set()
     if user.is_authenticated:
-        aliado = (
-            Alianza.objects
-            .filter(usuario=user, fecha_fin__isnull=True)
-            .first()
-        )
+        estado = _leer_estado(user, hoy)
+        aliado = estado["aliado"]
+        votos_usuario = estado["votados"]
 
         if aliado:
             dias_aliado = (hoy - aliado.fecha_inicio.date()).days
 
-    # 2. Obtener votos del día
-    votos_usuario = {}
-    if user.is_authenticated:
-        votos = Voto.objects.filter(usuario=user, fecha__date=hoy)
-        votos_usuario = {v.participante.id: True for v in votos}
+            # Los puntos del aliado se toman del ranking, que está al día
+            for p in ranking.obtener_ranking():
+                if p.id == aliado.participante_id:
+                    aliado.participante = p
+                    break
 
-    # 3. Obtener puntos de usuario
-    puntos_usuario = 0
-    # Puntos del usuario
+    # 2. Puntos del usuario
     puntos_usuario = 0
     if user.is_authenticated:
         puntos_usuario = user.puntos if hasattr(user, 'puntos') else 0
@@ -43,8 +81,16 @@ def get_user_status(user):
     return {
         "aliado": aliado,
         "es_aliado": aliado is not None,
-        "id_aliado": aliado.participante.id if aliado else None,
+        "id_aliado": aliado.participante_id if aliado else None,
         "dias_aliado": dias_aliado,
         "votos_usuario": votos_usuario,
         "puntos_usuario": puntos_usuario,
     }
+
+
+def estado_usuario(request):
+    """get_user_status calculado una sola vez por petición."""
+    if not hasattr(request, '_estado_usuario'):
+        with metricas.medir("estado"):
+            request._estado_usuario = get_user_status(request.user)
+    return request._estado_usuario
@@ -1,85 +1,66 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from .models import Participante, VideoTop, Reto, Voto, Alianza
+from .models import Participante, VideoTop, Reto, ObjetivoDonacion, Encuesta, OpcionEncuesta
 from django.contrib.auth import authenticate, login, logout
 from .forms import LoginForm, RegistroForm
-from datetime import date
-from django.utils import timezone
 from django.contrib import messages
-from .utils import get_user_status
+from .utils import estado_usuario
+from .paginacion import CursorInvalido, Pagina
+from .services import (
+    registrar_voto, encolar_voto, registrar_alianza, registrar_donacion, objetivos_con_total,
+    OperacionError, COSTE_VOTO, COSTE_ALIANZA
+)
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET, require_POST
+from django.conf import settings
+from . import api, encuestas, fragmentos, ranking, retos
 
 
+@fragmentos.pagina_publica
 def home(request):
-    participantes = Participante.objects.all().order_by('-puntos_totales')
-    info = get_user_status(request.user)
-
-    #AFINIDAD PUBLICO Participante
-    # Obtener el valor más alto
-    if participantes:
-        top_votos = participantes[0].votos_recibidos
-    else:
-        top_votos = 1  # para evitar división por cero
+    # Ranking ya ordenado y con la afinidad calculada (ver ranking.py)
+    participantes = ranking.obtener_ranking()
 
-    # Calcular afinidad por cada participante
-    for p in participantes:
-        if top_votos > 0:
-            p.afinidad = round((p.votos_recibidos / top_votos) * 100, 2)
-        else:
-            p.afinidad = 0
-
-    top_videos = VideoTop.objects.all().order_by('-fecha_subida')
+    top_videos = Pagina(VideoTop.objects.select_related('participante'), 'fecha_subida')
 
+    # Solo se evalúan si su fragmento cacheado ha caducado (ver fragmentos.py)
     context = {
         'participantes': participantes,
         'top_videos': top_videos,
-        **info   # <--- unimos toda la info del utils
+        **fragmentos.contexto(),
     }
     return render(request, 'main/home.html', context)
 
 
 
+@fragmentos.pagina_publica
 def participantes(request):
-    participantes = Participante.objects.all().order_by('-puntos_totales')
-    info = get_user_status(request.user)
-    
-    # Añadir aliados activos para cada participante
-    for p in participantes:
-        p.numero_aliados = Alianza.objects.filter(
-            participante=p, 
-            fecha_fin__isnull=True
-        ).count()
+    # Cada participante ya trae su número de aliados activos
+    participantes = ranking.obtener_ranking()
 
     context = {
         'participantes': participantes,
-        **info   # <--- unimos toda la info del utils
+        **fragmentos.contexto(),
     }
     return render(request, 'main/participantes.html', context)
 
+@fragmentos.pagina_publica
 def participante_detalle(request, pk):
     participante = get_object_or_404(Participante, pk=pk)
-    videos = VideoTop.objects.filter(participante=participante)
-    retos = Reto.objects.filter(participante=participante).order_by('-fecha')
-    numero_aliados = Alianza.objects.filter(participante=participante, fecha_fin__isnull=True).count()
+    videos = Pagina(VideoTop.objects.filter(participante=participante), 'fecha_subida')
+    retos = Pagina(Reto.objects.filter(participante=participante), 'fecha')
+    numero_aliados = participante.aliados_activos
 
-    user = request.user if request.user.is_authenticated else None
+    # Alianza y votos de hoy salen del estado cacheado del usuario
+    info = estado_usuario(request)
 
     # ¿Es aliado de este participante?
     alianza = None
-    if user:
-        alianza = Alianza.objects.filter(
-            usuario=user,
-            participante=participante,
-            fecha_fin__isnull=True  # alianza activa
-        ).first()
+    if info["id_aliado"] == participante.id:
+        alianza = info["aliado"]
 
     # ¿Ha votado hoy?
-    ha_votado = False
-    if user:
-        ha_votado = Voto.objects.filter(
-            usuario=user,
-            participante=participante,
-            fecha__date=date.today()
-        ).exists()
-
+    ha_votado = participante.id in info["votos_usuario"]
 
     return render(request, 'main/participante_detalle.html', {
         'p': participante,
@@ -90,79 +71,36 @@ def participante_detalle(request, pk):
         'ha_votado': ha_votado,
     })
 
-COSTE_VOTO = 10
-
+@require_POST
 def votar(request, pk):
     if not request.user.is_authenticated:
         return redirect('login')
 
-    usuario = request.user
-    participante = get_object_or_404(Participante, pk=pk)
+    # En modo ráfaga el voto se encola y se vuelca por lotes
+    registrar = encolar_voto if settings.VOTOS_MODO_RAFAGA else registrar_voto
 
-    # 1. Comprobar puntos suficientes
-    if usuario.puntos < COSTE_VOTO:
-        messages.error(request, "No tienes puntos suficientes para votar.")
+    try:
+        registrar(request.user, pk)
+    except Participante.DoesNotExist:
+        raise Http404("Participante no encontrado")
+    except OperacionError as e:
+        messages.error(request, str(e))
         return redirect('participante_detalle', pk=pk)
 
-    # 2. Evitar voto duplicado el mismo día
-    ya_voto_hoy = Voto.objects.filter(
-        usuario=usuario,
-        participante=participante,
-        fecha__date=timezone.now().date()
-    ).exists()
-
-    if ya_voto_hoy:
-        messages.error(request, "Ya votaste hoy a este participante.")
-        return redirect('participante_detalle', pk=pk)
-
-    # 3. Restar puntos al usuario
-    usuario.puntos -= COSTE_VOTO
-    usuario.save()
-
-    # 4. Registrar el voto y sumar puntos al participante
-    Voto.objects.create(
-        usuario=usuario,
-        participante=participante,
-        fecha=timezone.now()
-    )
-
-    participante.votos_recibidos += 1
-    participante.puntos_totales += 10  # si quieres que solo valga 1 voto = 10 pts
-    participante.save()
-
     messages.success(request, f"Has votado (-{COSTE_VOTO} puntos)")
     return redirect('participante_detalle', pk=pk)
-COSTE_ALIANZA = 50
-
 def aliarse(request, pk):
     if not request.user.is_authenticated:
         return redirect('login')
 
-    usuario = request.user
     participante = get_object_or_404(Participante, pk=pk)
 
-    # 1. Comprobar puntos
-    if usuario.puntos < COSTE_ALIANZA:
-        messages.error(request, "No tienes puntos suficientes para aliarte.")
+    try:
+        registrar_alianza(request.user, participante)
+    except OperacionError as e:
+        messages.error(request, str(e))
         return redirect('participante_detalle', pk=pk)
 
-    # 2. Cerrar alianzas actuales
-    Alianza.objects.filter(
-        usuario=usuario,
-        fecha_fin__isnull=True
-    ).update(fecha_fin=timezone.now())
-
-    # 3. Restar puntos
-    usuario.puntos -= COSTE_ALIANZA
-    usuario.save()
-
-    # 4. Crear nueva alianza
-    Alianza.objects.create(
-        usuario=usuario,
-        participante=participante,
-        fecha_inicio=timezone.now()
-    )
-
     messages.success(request, f"Ahora eres aliado de {participante.nombre} (-{COSTE_ALIANZA} puntos)")
     return redirect('participante_detalle', pk=pk)
 
@@ -170,44 +108,108 @@ def donar_puntos(request, objetivo_id):
     if not request.user.is_authenticated:
         return redirect("login")
 
-    usuario = request.user
-    objetivo = get_object_or_404(ObjetivoDonacion, id=objetivo_id)
+    if request.method != "POST":
+        return redirect("playground")
 
-    if request.method == "POST":
+    try:
         cantidad = int(request.POST.get("puntos", 0))
+    except ValueError:
+        cantidad = 0
+
+    try:
+        completado = registrar_donacion(request.user, objetivo_id, cantidad)
+    except ObjetivoDonacion.DoesNotExist:
+        raise Http404("Objetivo no encontrado")
+    except OperacionError as e:
+        messages.error(request, str(e))
+        return redirect("playground")
+
+    messages.success(request, f"Has donado {cantidad} puntos.")
+    if completado:
+        messages.success(request, "¡Objetivo completado!")
+    return redirect("playground")
 
-        # 1. Validación
-        if cantidad <= 0:
-            messages.error(request, "Debes donar una cantidad válida.")
-            return redirect("playground")
 
-        # 2. Comprobar puntos suficientes
-        if usuario.puntos < cantidad:
-            messages.error(request, "No tienes suficientes puntos.")
-            return redirect("playground")
+def _cargar_mas(request, queryset, campo, plantilla):
+    """Página siguiente de una lista (?cursor=...&participante=...) en HTML."""
+    try:
+        participante_id = int(request.GET['participante']) if request.GET.get('participante') else None
+        if participante_id:
+            queryset = queryset.filter(participante_id=participante_id)
+        pagina = Pagina(queryset, campo, request.GET.get('cursor'))
+    except (ValueError, CursorInvalido):
+        return HttpResponseBadRequest("Cursor no válido")
 
-        # 3. Consumir puntos del usuario
-        usuario.puntos -= cantidad
-        usuario.save()
+    return render(request, plantilla, {'pagina': pagina, 'participante_id': participante_id})
 
-        # 4. Registrar donación
-        reg, creado = DonacionUsuario.objects.get_or_create(
-            usuario=usuario,
-            objetivo=objetivo
-        )
-        reg.puntos_donados += cantidad
-        reg.save()
 
-        # 5. Actualizar objetivo
-        objetivo.puntos_actuales += cantidad
+@require_GET
+def mas_videos(request):
+    return _cargar_mas(
+        request, VideoTop.objects.select_related('participante'), 'fecha_subida',
+        'main/lista_videos.html',
+    )
 
-        if objetivo.puntos_actuales >= objetivo.puntos_necesarios:
-            objetivo.activo = False
 
-        objetivo.save()
+@require_GET
+def mas_retos(request):
+    return _cargar_mas(
+        request, Reto.objects.select_related('participante'), 'fecha', 'main/lista_retos.html'
+    )
+
+
+@require_POST
+def votar_encuesta(request, encuesta_id):
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Inicia sesión para votar."}, status=401)
+
+    try:
+        opcion_id = int(request.POST.get("opcion", ""))
+    except ValueError:
+        return JsonResponse({"error": "Opción no válida."}, status=400)
+
+    try:
+        encuestas.votar_encuesta(request.user, encuesta_id, opcion_id)
+    except (Encuesta.DoesNotExist, OpcionEncuesta.DoesNotExist):
+        raise Http404("Encuesta u opción no encontrada")
+    except encuestas.VotoEncuestaDuplicado as e:
+        return JsonResponse({"error": str(e)}, status=409)
+    except OperacionError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse({"ok": True}, status=201)
+
+
+@require_GET
+def resultados_encuesta(request, encuesta_id):
+    try:
+        return JsonResponse(encuestas.resultados(encuesta_id))
+    except Encuesta.DoesNotExist:
+        raise Http404("Encuesta no encontrada")
 
-        messages.success(request, f"Has donado {cantidad} puntos.")
-        return redirect("playground")
+
+# ───────────────────────────────
+# API JSON (widgets / overlay)
+# ───────────────────────────────
+@require_GET
+@condition(etag_func=api.etag)
+def api_ranking(request):
+    return HttpResponse(api.ranking_json(), content_type="application/json")
+
+
+@require_GET
+@condition(etag_func=api.etag)
+def api_participante(request, pk):
+    try:
+        return HttpResponse(api.participante_json(pk), content_type="application/json")
+    except Participante.DoesNotExist:
+        raise Http404("Participante no encontrado")
+
+
+@require_GET
+@cache_control(private=True, no_cache=True)
+def api_estado(request):
+    return JsonResponse(api.estado(request.user, estado_usuario(request)))
 
 
 def login_view(request):
@@ -241,36 +243,25 @@ def logout_view(request):
 
 
 
-from django.shortcuts import render, get_object_or_404, redirect
-from django.utils import timezone
-from .models import (
-    Participante,
-    ObjetivoDonacion,
-    DonacionUsuario,
-    Reto
-)
-from .utils import get_user_status
-
-
 def playground(request):
-    # Info general del usuario (alianza, votos, etc.)
-    info = get_user_status(request.user)
-
     # Participantes eliminados
     eliminados = Participante.objects.filter(eliminado=True)
 
-    # Reto activo (ejemplo: el reto más reciente)
-    retos_participantes = Reto.objects.all().order_by('-fecha')
+    # Retos de los participantes, del más reciente al más antiguo (por páginas)
+    retos_participantes = Pagina(Reto.objects.select_related('participante'), 'fecha')
 
-    # Objetivos colectivos activos (donaciones)
-    objetivos = ObjetivoDonacion.objects.filter(activo=True)
+    # Objetivos colectivos activos (donaciones), con lo donado en sus fracciones
+    objetivos = objetivos_con_total().filter(activo=True)
 
+    # Progreso del usuario en sus retos (filas ya calculadas por retos.py)
+    mis_retos = retos.progreso_usuario(request.user)
 
     context = {
-        **info,
         "eliminados": eliminados,
         "retos_participantes": retos_participantes,
-        "objetivos": objetivos
+        "objetivos": objetivos,
+        "mis_retos": mis_retos,
+        **fragmentos.contexto(),
     }
 
     return render(request, "main/playground.html", context)